@@ -4,7 +4,8 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
-import random
+from heuristics import degree_score
+from search import Deadline, MoveOrdering, NegamaxSearch, TimeManager
 
 
 class SearchTimeout(Exception):
@@ -33,59 +34,11 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    moves_my_player = game.get_legal_moves(player)
-    moves_opp_player = game.get_legal_moves(game.get_opponent(player))
-
-    nMoves_my_player = len(moves_my_player)
-    nMoves_opp_player = len(moves_opp_player)
-
-    factor_my_player = 0.
-    factor_opp_player = 0.
-
-    board_corners = [(0,0),(0,6),(6,0),(6,6)]
-    three_moves = [(0,1),(1,0),(0,5),(1,6),(5,0),(6,1),(5,6),(6,5)]
-    four_moves = [(0,2),(0,3),(0,4),(1,1),(1,5),(2,0),(3,0),(4,0),(2,6),(3,6),(4,6),(5,1),(5,5),(6,2),(6,3),(6,4)]
-    six_moves = [(1,2),(1,3),(1,4),(2,1),(3,1),(4,1),(2,5),(3,5),(4,5),(5,2),(5,3),(5,4)]
-    center = (3, 3)
-
-    for aMove in moves_my_player:
-        if aMove in board_corners:
-            factor_my_player += 4
-        elif aMove in three_moves:
-            factor_my_player += 9
-        elif aMove in four_moves:
-            factor_my_player += 16
-        elif aMove in six_moves:
-            factor_my_player += 36
-        else:
-            factor_my_player += 64
-
-    for aMove in moves_opp_player:
-        if aMove in board_corners:
-            factor_opp_player += 4
-        elif aMove in three_moves:
-            factor_opp_player += 9
-        elif aMove in four_moves:
-            factor_opp_player += 16
-        elif aMove in six_moves:
-            factor_opp_player += 36
-        else:
-            factor_opp_player += 64
-
-    if center in moves_my_player:
-        factor_my_player += 100
-    elif center in moves_opp_player:
-        factor_opp_player += 100
-
-    return factor_my_player - factor_opp_player
-
-class CustomPlayer:
+    # Legal moves weighted by the squared number of moves out of their cell,
+    # plus a bonus for reaching the center of the board
+    return degree_score(game, player, power=2, center_bonus=100.)
+
+class CustomPlayer(NegamaxSearch):
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
 
@@ -98,6 +51,9 @@ class CustomPlayer:
         COMPETITION.  IT IS NOT REQUIRED FOR THE ISOLATION PROJECT REVIEW.
     **************************************************************************
 
+    The search is a `search.NegamaxSearch` with alpha-beta pruning and
+    iterative deepening.
+
     Parameters
     ----------
     data : string
@@ -108,12 +64,55 @@ class CustomPlayer:
         the PvP competition uses more accurate timers that are not cross-
         platform compatible, so a limit of 1ms (vs 10ms for the other classes)
         is generally sufficient.
+
+    in_place : bool (optional)
+        Search the board passed to get_move() itself (it is restored
+        afterwards) instead of a copy of it.
+
+    ordering : bool (optional)
+        Search the children of every node in the order given by a
+        `search.MoveOrdering` (principal variation, killer and history
+        moves) instead of the move generation order.
+
+    pvs : bool (optional)
+        Use Principal Variation Search: search all but the first child of a
+        node with a null window, re-searching it only when that fails.
+
+    aspiration : float (optional)
+        Start every iteration after the first with a window of this margin
+        around the previous iteration's score (None for a full window).
+
+    endgame : bool (optional)
+        Solve positions where the players can no longer reach each other
+        exactly (see `search.solve_endgame()`) instead of searching them.
+
+    book : `opening_book.OpeningBook` (optional)
+        Play the moves stored in this opening book without searching the
+        positions found in it.
+
+    time_management : bool (optional)
+        Plan the iterations of iterative deepening with a
+        `search.TimeManager` instead of deepening until the time runs out.
+
+    stats : `search.SearchStats` (optional)
+        Report every move to this statistics collector.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., in_place=False, ordering=True,
+                 pvs=False, aspiration=None, endgame=True, book=None,
+                 time_management=True, stats=None):
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.timer = Deadline(None, timeout)
+        self.in_place = in_place
+        self.ordering = MoveOrdering() if ordering else None
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.endgame = endgame
+        self.book = book
+        self.time_manager = TimeManager() if time_management else None
+        self.stats = stats
 
     def get_move(self, game, time_left):
         #print("AB_get_move()")
@@ -126,62 +125,18 @@ class CustomPlayer:
         if self.time_left() <= 0:
             return best_move
 
-        try:
-            depth = 1
-            while True:
-                if self.time_left() < self.TIMER_THRESHOLD:
-                    raise SearchTimeout()
-                best_move = self.alphabeta(game, depth)
-                depth += 1
-        except SearchTimeout:
-            return best_move
-        return best_move
+        stats = self.stats
+        if stats is not None:
+            stats.start_move(self, game, time_left)
+        move, search = self.choose_move(game, best_move)
+        if stats is not None:
+            stats.finish_move(self, move, search)
+        return move
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         #print("AB_alphabeta()")
-        best_score = float("-inf")
-        best_move = None
-
         # print("in AlphaBetaPlayer.alphabeta()")
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
-
-        if len(game.get_legal_moves()) > 0:
-            best_move = game.get_legal_moves()[0]
-
-        for aMove in game.get_legal_moves():
-            aScore = self.min_value(game.forecast_move(aMove), depth-1, alpha, beta)
-            if aScore > best_score:
-                best_score = aScore
-                best_move = aMove
-            alpha = max(alpha, aScore)
-        return best_move
-
-    def terminal_test(self, game):
-        return not bool(game.get_legal_moves())
-
-    def max_value(self, game, depth, alpha, beta):
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            return self.score(game, self)
-        aScore = float("-inf")
-        for aMove in game.get_legal_moves():
-            aScore = max(aScore, self.min_value(game.forecast_move(aMove), depth-1, alpha, beta))
-            if aScore >= beta:
-                return aScore
-            alpha = max(alpha, aScore)
-        return aScore
-
-    def min_value(self, game, depth, alpha, beta):
-        if self.time_left() < self.TIMER_THRESHOLD:
+        result = self.search_iteration(game, depth, alpha, beta)
+        if result is None:
             raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            return self.score(game, self)
-        aScore = float("inf")
-        for aMove in game.get_legal_moves():
-            aScore = min(aScore, self.max_value(game.forecast_move(aMove), depth-1, alpha, beta))
-            if aScore <= alpha:
-                return aScore
-            beta = min(beta, aScore)
-        return aScore
+        return result[1]
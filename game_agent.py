@@ -4,6 +4,12 @@ and include the results in your report.
 """
 import random
 import math
+import multiprocessing
+import time
+
+from heuristics import degree_score
+from search import (Deadline, MoveOrdering, NegamaxSearch, TimeManager,
+                    TranspositionTable)
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
@@ -33,142 +39,48 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    moves_my_player = game.get_legal_moves(player)
-    moves_opp_player = game.get_legal_moves(game.get_opponent(player))
-
-    nMoves_my_player = len(moves_my_player)
-    nMoves_opp_player = len(moves_opp_player)
+    nMoves_my_player, nMoves_opp_player, utility = game.mobility(player)
+    if utility:
+        return utility
 
     return float(nMoves_my_player - nMoves_opp_player)
 
 def custom_score_2(game, player):
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    moves_my_player = game.get_legal_moves(player)
-    moves_opp_player = game.get_legal_moves(game.get_opponent(player))
-
-    nMoves_my_player = len(moves_my_player)
-    nMoves_opp_player = len(moves_opp_player)
-
-    factor_my_player = 0.
-    factor_opp_player = 0.
-
-    board_corners = [(0,0),(0,6),(6,0),(6,6)]
-    three_moves = [(0,1),(1,0),(0,5),(1,6),(5,0),(6,1),(5,6),(6,5)]
-    four_moves = [(0,2),(0,3),(0,4),(1,1),(1,5),(2,0),(3,0),(4,0),(2,6),(3,6),(4,6),(5,1),(5,5),(6,2),(6,3),(6,4)]
-    six_moves = [(1,2),(1,3),(1,4),(2,1),(3,1),(4,1),(2,5),(3,5),(4,5),(5,2),(5,3),(5,4)]
-    center = (3, 3)
-
-    for aMove in moves_my_player:
-        if aMove in board_corners:
-            factor_my_player += 2
-        elif aMove in three_moves:
-            factor_my_player += 3
-        elif aMove in four_moves:
-            factor_my_player += 4
-        elif aMove in six_moves:
-            factor_my_player += 6
-        else:
-            factor_my_player += 8
-
-    for aMove in moves_opp_player:
-        if aMove in board_corners:
-            factor_opp_player += 2
-        elif aMove in three_moves:
-            factor_opp_player += 3
-        elif aMove in four_moves:
-            factor_opp_player += 4
-        elif aMove in six_moves:
-            factor_opp_player += 6
-        else:
-            factor_opp_player += 8
-
-    # if center in moves_my_player:
-    #     factor_my_player += 10
-    # elif center in moves_opp_player:
-    #     factor_opp_player += 10
-
-    return factor_my_player - factor_opp_player
+    # Every legal move counts with the number of moves out of the cell it
+    # leads to (2 in a corner of a 7x7 board, 8 in its middle)
+    return degree_score(game, player, power=1)
 
 def custom_score_3(game, player):
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
-
-    moves_my_player = game.get_legal_moves(player)
-    moves_opp_player = game.get_legal_moves(game.get_opponent(player))
-
-    nMoves_my_player = len(moves_my_player)
-    nMoves_opp_player = len(moves_opp_player)
-
-    factor_my_player = 0.
-    factor_opp_player = 0.
-
-    board_corners = [(0,0),(0,6),(6,0),(6,6)]
-    three_moves = [(0,1),(1,0),(0,5),(1,6),(5,0),(6,1),(5,6),(6,5)]
-    four_moves = [(0,2),(0,3),(0,4),(1,1),(1,5),(2,0),(3,0),(4,0),(2,6),(3,6),(4,6),(5,1),(5,5),(6,2),(6,3),(6,4)]
-    six_moves = [(1,2),(1,3),(1,4),(2,1),(3,1),(4,1),(2,5),(3,5),(4,5),(5,2),(5,3),(5,4)]
-    center = (3, 3)
-
-    for aMove in moves_my_player:
-        if aMove in board_corners:
-            factor_my_player += 4
-        elif aMove in three_moves:
-            factor_my_player += 9
-        elif aMove in four_moves:
-            factor_my_player += 16
-        elif aMove in six_moves:
-            factor_my_player += 36
-        else:
-            factor_my_player += 64
-
-    for aMove in moves_opp_player:
-        if aMove in board_corners:
-            factor_opp_player += 4
-        elif aMove in three_moves:
-            factor_opp_player += 9
-        elif aMove in four_moves:
-            factor_opp_player += 16
-        elif aMove in six_moves:
-            factor_opp_player += 36
-        else:
-            factor_opp_player += 64
-
-    # if center in moves_my_player:
-    #     factor_my_player += 100
-    # elif center in moves_opp_player:
-    #     factor_opp_player += 100
-
-    return factor_my_player - factor_opp_player
+    # As custom_score_2, with the squared number of moves out of the cell
+    return degree_score(game, player, power=2)
 
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents -- this class is never
     constructed or tested directly.
     """
-    def __init__(self, search_depth=3, score_fn=custom_score, timeout=15.):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=15.,
+                 in_place=False):
         #print("in IsolationPlayer.__init__()")
         self.search_depth = search_depth
         self.score = score_fn
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
-
-class MinimaxPlayer(IsolationPlayer):
+        # Search the board passed to get_move() itself (it is restored
+        # afterwards) instead of a copy of it; see search.NegamaxSearch
+        self.in_place = in_place
+        # The interior nodes of the search check the clock through this
+        # timer, which only calls time_left() every few nodes; it is given
+        # the current time_left() at the start of every search
+        self.timer = Deadline(None, timeout)
+
+class MinimaxPlayer(IsolationPlayer, NegamaxSearch):
     """Game-playing agent that chooses a move using depth-limited minimax
     search. You must finish and test this player to make sure it properly uses
     minimax to return a good move before the search time limit expires.
+
+    The search is a `search.NegamaxSearch` without pruning.
     """
+    pruning = False
 
     def get_move(self, game, time_left):
         self.time_left = time_left
@@ -188,53 +100,141 @@ class MinimaxPlayer(IsolationPlayer):
 
     def minimax(self, game, depth):
         #print("in MinimaxPlayer.minimax()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        result = self.search_iteration(game, depth)
+        if result is None:
             raise SearchTimeout()
-
-        best_score = float("-inf")
-        best_move = None
-
-        if len(game.get_legal_moves()) > 0:
-            best_move = game.get_legal_moves()[0]
-
-        for aMove in game.get_legal_moves():
-            aScore = self.min_value(game.forecast_move(aMove), depth-1)
-            if aScore > best_score:
-                best_score = aScore
-                best_move = aMove
-        return best_move
-
-    def terminal_test(self, game):
-        #print("in MinimaxPlayer.terminal_test()")
-        return not bool(game.get_legal_moves())
+        return result[1]
 
     def max_value(self, game, depth):
         #print("in MinimaxPlayer.max_value()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        self.start_search()
+        value = self.negamax(game, depth, float("-inf"), float("inf"), 0, 1)
+        if self.aborted:
             raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            return self.score(game, self)
-        aScore = float("-inf")
-        for aMove in game.get_legal_moves():
-            aScore = max(aScore, self.min_value(game.forecast_move(aMove), depth-1))
-        return aScore
+        return value
 
     def min_value(self, game, depth):
         #print("in MinimaxPlayer.min_value()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        self.start_search()
+        value = -self.negamax(game, depth, float("-inf"), float("inf"), 0, -1)
+        if self.aborted:
             raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            return self.score(game, self)
-        aScore = float("inf")
-        for aMove in game.get_legal_moves():
-            aScore = min(aScore, self.max_value(game.forecast_move(aMove), depth-1))
-        return aScore
-
-class AlphaBetaPlayer(IsolationPlayer):
+        return value
+
+class AlphaBetaPlayer(IsolationPlayer, NegamaxSearch):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    The search is a `search.NegamaxSearch`, configured by the options below.
+
+    Search results are kept in a transposition table of at most `tt_size`
+    entries (pass 0 to disable it), which carries over from one iteration
+    and one get_move() call to the next. With `ordering` set, the children
+    of every node are searched in the order given by a `search.MoveOrdering`
+    (principal variation, killer and history moves).
+
+    With `pvs` set the search runs as Principal Variation Search: only the
+    first child of a node is searched with the full window, the others with
+    a null window that merely proves them worse, and are re-searched when
+    that fails. With `aspiration` set to a score margin, every iteration
+    after the first starts with the window (score - aspiration, score +
+    aspiration) around the previous iteration's score, widening the failing
+    side to infinity when the root score falls outside of it.
+
+    With `canonical_plies` set, positions within that many moves of the start
+    of the game share transposition table entries with their rotations and
+    reflections (see `Board.canonical_hash()`).
+
+    With `endgame` set, a position where the two players can no longer reach
+    each other is solved exactly with `search.solve_endgame()` before any
+    alpha-beta search, and the proven result is played.
+
+    With `workers` greater than 1 the root moves are split between that many
+    worker processes, each running this search (with its own transposition
+    table) on its share of the moves; the best move of the deepest iteration
+    completed by all of them is played (a proven win at once, and ignoring
+    the workers whose moves are all proven to lose). The pool is started by the
+    constructor and runs until close() is called. The workers stop on their
+    own, `timeout` milliseconds before the results are collected, on a
+    deadline measured with `time.perf_counter()`, so the process clocks must
+    agree (as they do on Linux, macOS and Windows). `score_fn` must be
+    picklable, e.g. a module level function, for the workers to use it.
+
+    With `pondering` set the player searches in a single worker process
+    (started the same way) and thinks on its opponent's time when the game
+    is played with `Board.play(ponder=True)`: ponder() starts a background
+    search of the position after the reply predicted by the principal
+    variation. If the opponent plays that reply, the next get_move() just
+    extends the deadline of the running search; otherwise the search is
+    stopped and the actual position is searched, in the same process and
+    with the transposition table filled while pondering. Pondering cannot be
+    combined with `workers`.
+
+    With `book` set to an `opening_book.OpeningBook`, positions found in the
+    book are played from it without searching.
+
+    With `time_management` set, iterative deepening is planned by a
+    `search.TimeManager`: it stops once the result is proven, skips an
+    iteration that is predicted to be cut off before producing a result,
+    and keeps the best move of an interrupted iteration once the previous
+    best move has been searched in it. A position with a single legal move is always played
+    without searching. (The pondering process always deepens until its
+    deadline, which moves when the opponent plays the expected reply.)
+
+    With `stats` set to a `search.SearchStats` collector, every move is
+    reported to it, which records the nodes searched, the depth reached,
+    the time used and the rates of cutoffs and table hits.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=15.,
+                 in_place=False, tt_size=1 << 15, ordering=True, pvs=False,
+                 aspiration=None, canonical_plies=0, endgame=True, workers=0,
+                 pondering=False, book=None, time_management=True, stats=None):
+        super().__init__(search_depth, score_fn, timeout, in_place)
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.ordering = MoveOrdering() if ordering else None
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.canonical_plies = canonical_plies
+        self.endgame = endgame
+        self.workers = workers
+        self.pondering = pondering
+        self.book = book
+        self.time_manager = TimeManager() if time_management else None
+        self.stats = stats
+        self._pool = None
+        # Pondering state: the perf_counter() time at which the search
+        # process stops and the number of the search it may run (both shared
+        # with it), the number of searches started, the running search and
+        # the hash of the position it searches if it is pondering, and the
+        # principal variation found by the last search
+        self._deadline = None
+        self._current_job = None
+        self._jobs = 0
+        self._job = None
+        self._ponder_key = None
+        self._pv = ()
+        if workers > 1 and pondering:
+            raise ValueError("Pondering cannot be combined with parallel workers.")
+        if workers > 1 or pondering:
+            config = dict(search_depth=search_depth, score_fn=score_fn,
+                          timeout=timeout, in_place=in_place, tt_size=tt_size,
+                          ordering=ordering, pvs=pvs, aspiration=aspiration,
+                          canonical_plies=canonical_plies, endgame=False,
+                          time_management=time_management and not pondering)
+            if pondering:
+                self._deadline = multiprocessing.Value('d', 0., lock=False)
+                self._current_job = multiprocessing.Value('l', 0, lock=False)
+            self._pool = multiprocessing.Pool(
+                max(workers, 1), _init_search_worker,
+                (config, self._deadline, self._current_job))
+
+    def close(self):
+        """Shut down the worker processes of a parallel or pondering player."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+            self._job = None
 
     def get_move(self, game, time_left):
         #print("AB_get_move()")
@@ -247,71 +247,356 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.time_left() <= 0:
             return best_move
 
+        stats = self.stats
+        if stats is not None:
+            stats.start_move(self, game, time_left)
+        move, search = self.choose_move(game, best_move)
+        if stats is not None:
+            stats.finish_move(self, move, search)
+        return move
+
+    def immediate_move(self, game):
+        """Return the move to play in `game` without a search, or None (see
+        `search.NegamaxSearch.immediate_move()`), stopping the pondering
+        search if there is one.
+        """
+        move = super().immediate_move(game)
+        if move is not None:
+            # A pondering search must not run on into the next one
+            self.stop_search(max(0., self.time_left() - self.TIMER_THRESHOLD) / 1000.)
+        return move
+
+    def search_move(self, game, best_move):
+        """Return the best move for `game` found in the pondering process,
+        by the parallel workers or by iterative deepening in this process,
+        and how it was found.
+        """
+        if self.pondering:
+            return self.pondering_move(game, best_move), "ponder"
+        if self._pool is not None:
+            return self.parallel_move(game, best_move), "parallel"
+        return super().search_move(game, best_move)
+
+    def ponder(self, game, time_limit):
+        """Start searching, in the background and for at most `time_limit`
+        milliseconds, the position expected to follow the opponent's reply
+        in `game` (a copy of the game with the opponent to move).
+        """
+        if not self.pondering:
+            return
+        self.stop_search(0.)
+        moves = game.get_legal_moves(shuffle=False)
+        if not moves:
+            return
+        pv = self._pv
+        if len(pv) > 1 and pv[0] == game.get_player_location(self) and pv[1] in moves:
+            reply = pv[1]
+        else:
+            reply = moves[0]
+        game.apply_move(reply)
+        self.start_job(game, time.perf_counter() + time_limit / 1000.)
+        self._ponder_key = game.hash()
+
+    def start_job(self, game, end):
+        """Start searching `game` in the pondering process until the
+        `time.perf_counter()` time `end`.
+
+        Every search gets a new number, and runs only as long as it is the
+        current one, so a search that was stopped cannot take over the
+        deadline of the next one while it winds down.
+        """
+        self._jobs += 1
+        self._current_job.value = self._jobs
+        self._deadline.value = end
+        self._job = self._pool.apply_async(
+            _ponder_worker, (type(game), game.to_bytes(), self._jobs))
+
+    def stop_search(self, timeout):
+        """Stop the search running in the pondering process, if any, waiting
+        for at most `timeout` seconds for it to finish.
+        """
+        if self._job is not None:
+            self._current_job.value = 0
+            self._job.wait(timeout)
+            self._job = None
+            self._ponder_key = None
+
+    def pondering_move(self, game, best_move):
+        """Return the best move for `game` found in the pondering process,
+        continuing the pondering search if it is already searching `game`.
+        """
+        end = time.perf_counter() + self.time_left() / 1000.
+        if self._ponder_key != game.hash() or self._job.ready():
+            self.stop_search(max(0., self.time_left() - self.TIMER_THRESHOLD) / 1000.)
+        if self._job is None:
+            self.start_job(game, end)
+        else:
+            self._deadline.value = end
+        self._ponder_key = None
         try:
-            depth = 1
-            while True:
-                if self.time_left() < self.TIMER_THRESHOLD:
-                    raise SearchTimeout()
-                best_move = self.alphabeta(game, depth)
-                depth += 1
-        except SearchTimeout:
+            iterations, self._pv = self._job.get(
+                max(0., self.time_left() - self.TIMER_THRESHOLD) / 1000.)
+        except multiprocessing.TimeoutError:
+            # No result in time (the process may still have been winding
+            # down a stopped search): play the best move one ply deep
+            self.stop_search(0.)
+            moves = game.get_legal_moves()
+            if not moves:
+                return best_move
+            return max(moves, key=lambda move: self.score(game.forecast_move(move), self))
+        self._job = None
+        if not iterations:
             return best_move
-        return best_move
+        _, self._score, move = iterations[-1]
+        return move
+
+    def parallel_move(self, game, best_move):
+        """Split the root moves of `game` between the worker processes and
+        return the best move found by them in the time left (`best_move` if
+        there is nothing to search).
+        """
+        moves = game.get_legal_moves(distinct=game.move_count < 2)
+        if len(moves) < 2:
+            return moves[0] if moves else best_move
+        end = time.perf_counter() + self.time_left() / 1000.
+        data = game.to_bytes()
+        jobs = [self._pool.apply_async(_search_worker,
+                                       (type(game), data, moves[i::self.workers], end))
+                for i in range(min(self.workers, len(moves)))]
+        results = []
+        for job in jobs:
+            try:
+                iterations = job.get(max(0., self.time_left() - self.TIMER_THRESHOLD) / 1000.)
+            except multiprocessing.TimeoutError:
+                continue
+            if iterations:
+                results.append(iterations)
+        if not results:
+            return moves[0]
+        _, self._score, move = _best_iteration(results)
+        return move
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         #print("AB_alphabeta()")
-        best_score = float("-inf")
-        best_move = None
-
         # print("in AlphaBetaPlayer.alphabeta()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        result = self.search_iteration(game, depth, alpha, beta)
+        if result is None:
             raise SearchTimeout()
-
-        if len(game.get_legal_moves()) > 0:
-            best_move = game.get_legal_moves()[0]
-
-        for aMove in game.get_legal_moves():
-            aScore = self.min_value(game.forecast_move(aMove), depth-1, alpha, beta)
-            if aScore > best_score:
-                best_score = aScore
-                best_move = aMove
-            alpha = max(alpha, aScore)
-        return best_move
-
-    def terminal_test(self, game):
-        #print("in MinimaxPlayer.terminal_test()")
-        return not bool(game.get_legal_moves())
+        return result[1]
 
     def max_value(self, game, depth, alpha, beta):
         #print("in AB_Max()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        self.start_search()
+        value = self.negamax(game, depth, alpha, beta, self._depth - depth, 1)
+        if self.aborted:
             raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            #print("AB_Max: Cutoff. depth=", depth, "terminate=", self.terminal_test(game))
-            #print("\tScore=", self.score(game, self))
-            #game.to_string()
-            return self.score(game, self)
-        aScore = float("-inf")
-        for aMove in game.get_legal_moves():
-            aScore = max(aScore, self.min_value(game.forecast_move(aMove), depth-1, alpha, beta))
-            if aScore >= beta:
-                return aScore
-            alpha = max(alpha, aScore)
-        return aScore
+        return value
 
     def min_value(self, game, depth, alpha, beta):
         #print("in AB_Min()")
-        if self.time_left() < self.TIMER_THRESHOLD:
+        self.start_search()
+        value = -self.negamax(game, depth, -beta, -alpha, self._depth - depth, -1)
+        if self.aborted:
             raise SearchTimeout()
-        if depth == 0 or self.terminal_test(game):
-            #print("AB_Min: Cutoff. depth=", depth, "terminate=", self.terminal_test(game))
-            #print("\tScore=", self.score(game, self))
-            #game.to_string()
-            return self.score(game, self)
-        aScore = float("inf")
-        for aMove in game.get_legal_moves():
-            aScore = min(aScore, self.max_value(game.forecast_move(aMove), depth-1, alpha, beta))
-            if aScore <= alpha:
-                return aScore
-            beta = min(beta, aScore)
-        return aScore
+        return value
+
+
+class _MCTSNode:
+    """A node of the MCTSPlayer search tree: the state reached by `move`,
+    with the player who made it, the hash of the state, the expanded
+    children, the moves not expanded yet, and the playout statistics.
+    """
+    __slots__ = ('move', 'player', 'key', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, player, key, untried):
+        self.move = move
+        self.player = player
+        self.key = key
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0
+
+class MCTSPlayer(IsolationPlayer):
+    """Game-playing agent that chooses a move using Monte Carlo Tree Search
+    with the UCT selection rule, running random playouts until the search
+    time limit and playing the most visited move.
+
+    The search walks the board passed to get_move() with apply_move() and
+    undo_move() (for the tree path and the playouts alike), so the board
+    class must provide undo_move(); no board copies are made. With `reuse`
+    set, the subtree below the opponent's actual reply is kept as the root
+    of the next search.
+
+    Parameters
+    ----------
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    exploration : float (optional)
+        The UCT exploration constant.
+
+    reuse : bool (optional)
+        Keep the search tree between moves.
+
+    seed : hashable (optional)
+        Seed for the random number generator of the playouts.
+    """
+    def __init__(self, timeout=15., exploration=math.sqrt(2), reuse=True,
+                 seed=None):
+        super().__init__(timeout=timeout, in_place=True)
+        self.exploration = exploration
+        self.reuse = reuse
+        self.rng = random.Random(seed)
+        self._root = None
+
+    def get_move(self, game, time_left):
+        self.time_left = time_left
+
+        best_move = (-1, -1)
+
+        if self.time_left() <= 0:
+            return best_move
+
+        root = self.find_root(game)
+        while self.time_left() >= self.TIMER_THRESHOLD:
+            self.iterate(game, root)
+
+        if not root.children:
+            return best_move
+        best = max(root.children, key=lambda child: child.visits)
+        self._root = best if self.reuse else None
+        return best.move
+
+    def find_root(self, game):
+        """Return the node of the kept tree holding the state of `game` (the
+        reply of the opponent to our last move), or a new root node.
+        """
+        if self._root is not None:
+            for child in self._root.children:
+                if child.key == game.hash():
+                    return child
+        return _MCTSNode(None, game.inactive_player, game.hash(),
+                         game.get_legal_moves(distinct=game.move_count < 2))
+
+    def iterate(self, game, root):
+        """Run one select, expand, playout and backpropagation step of the
+        search from `root`, the node of the current state of `game`, leaving
+        `game` unchanged.
+        """
+        node = root
+        path = [node]
+        # Selection
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: (
+                child.wins / child.visits +
+                self.exploration * math.sqrt(log_visits / child.visits)))
+            game.apply_move(node.move)
+            path.append(node)
+        # Expansion
+        if node.untried:
+            move = node.untried.pop()
+            game.apply_move(move)
+            child = _MCTSNode(move, game.inactive_player, game.hash(),
+                              game.get_legal_moves(distinct=game.move_count < 2))
+            node.children.append(child)
+            node = child
+            path.append(node)
+        # Playout
+        plies = len(path) - 1
+        moves = game.get_legal_moves(shuffle=False)
+        while moves:
+            game.apply_move(self.rng.choice(moves))
+            plies += 1
+            moves = game.get_legal_moves(shuffle=False)
+        loser = game.active_player
+        for _ in range(plies):
+            game.undo_move()
+        # Backpropagation
+        for node in path:
+            node.visits += 1
+            if node.player != loser:
+                node.wins += 1
+
+
+# The player of a search worker process, and the deadline and the number of
+# the current search shared with the pondering process (None in parallel
+# search workers)
+_worker_player = None
+_worker_deadline = None
+_worker_current_job = None
+
+def _init_search_worker(config, deadline=None, current_job=None):
+    """Create the player of a search worker process."""
+    global _worker_player, _worker_deadline, _worker_current_job
+    _worker_player = AlphaBetaPlayer(**config)
+    _worker_deadline = deadline
+    _worker_current_job = current_job
+
+def _worker_game(board_class, data):
+    """Return the position `data` (serialized with `Board.to_bytes()`) with
+    the worker player to move, and prepare the player for a new search.
+    """
+    player = _worker_player
+    game = board_class.from_bytes(data, player, "Opponent")
+    if game.active_player is not player:
+        game = board_class.from_bytes(data, "Opponent", player)
+    if player.tt is not None:
+        player.tt.new_search()
+    if player.ordering is not None:
+        player.ordering.new_search()
+    return game
+
+def _search_worker(board_class, data, moves, end):
+    """Search the root `moves` of the position `data` with iterative
+    deepening until `timeout` milliseconds before the `time.perf_counter()`
+    time `end`, and return the completed iterations (without the result of
+    an interrupted one, which is not comparable between workers).
+    """
+    player = _worker_player
+    game = _worker_game(board_class, data)
+    player.root_moves = moves
+    player.time_left = lambda: (end - time.perf_counter()) * 1000. - player.TIMER_THRESHOLD
+    return player.iterative_deepening(game, partial=False)
+
+def _best_iteration(results):
+    """Return the `(depth, score, move)` of the best move found by the
+    parallel workers, given the completed iterations of every worker that
+    completed any.
+    """
+    for iterations in results:
+        for iteration in iterations:
+            if iteration[1] == float("inf"):
+                return iteration
+    # A worker whose moves are all proven to lose stops early; it must not
+    # limit the depth at which the others are compared
+    open_results = [iterations for iterations in results
+                    if iterations[-1][1] != float("-inf")]
+    if not open_results:
+        return max((iterations[-1] for iterations in results),
+                   key=lambda iteration: iteration[0])
+    # Scores are only comparable between searches of the same depth
+    depth = min(iterations[-1][0] for iterations in open_results)
+    return max((iterations[depth - 1] for iterations in open_results),
+               key=lambda iteration: iteration[1])
+
+def _ponder_worker(board_class, data, job):
+    """Search the position `data` with iterative deepening until `timeout`
+    milliseconds before the shared deadline (which may be moved while the
+    search runs), or until `job` is no longer the current search, and return
+    the completed iterations and the principal variation of the last one.
+    """
+    player = _worker_player
+    game = _worker_game(board_class, data)
+    deadline = _worker_deadline
+    current_job = _worker_current_job
+
+    def time_left():
+        if current_job.value != job:
+            return 0.
+        return (deadline.value - time.perf_counter()) * 1000. - player.TIMER_THRESHOLD
+
+    player.time_left = time_left
+    iterations = player.iterative_deepening(game)
+    return iterations, player.ordering.pv if player.ordering is not None else ()
@@ -0,0 +1,109 @@
+"""Table-driven evaluation functions that work on boards of any size.
+
+The heuristics weigh every cell a player can move to with a per-cell weight
+table, such as the number of knight moves out of the cell on an empty board
+(its degree). The tables are built once per board size and cached in this
+module, so evaluating a position costs one table lookup per legal move:
+
+    weights = degree_weights(game.width, game.height)
+    value = weighted_mobility(game, player, weights)
+
+Tables are indexed as `weights[row][column]`, like the moves of a board.
+"""
+
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2), (1, 2), (2, -1), (2, 1)]
+
+# The weight tables built so far, by (kind, width, height, parameter)
+_tables = {}
+
+
+def knight_degrees(width, height):
+    """Return the number of knight moves out of every cell of an empty board
+    of the given size, indexed by `[row][column]`.
+    """
+    key = ("degree", width, height, None)
+    if key not in _tables:
+        _tables[key] = tuple(
+            tuple(sum(1 for dr, dc in KNIGHT_DIRECTIONS
+                      if 0 <= r + dr < height and 0 <= c + dc < width)
+                  for c in range(width))
+            for r in range(height))
+    return _tables[key]
+
+
+def degree_weights(width, height, power=1):
+    """Return the weight table `degree ** power` of a board of the given size
+    (see `knight_degrees()`): a move into a corner of a 7x7 board weighs 2
+    with `power=1`, a move into its middle 8.
+    """
+    key = ("degree", width, height, power)
+    if key not in _tables:
+        _tables[key] = tuple(
+            tuple(float(degree ** power) for degree in row)
+            for row in knight_degrees(width, height))
+    return _tables[key]
+
+
+def center_cells(width, height):
+    """Return the set of the central cells of a board of the given size: one
+    cell if both sides are odd, up to four otherwise.
+    """
+    key = ("center", width, height, None)
+    if key not in _tables:
+        _tables[key] = frozenset((r, c)
+                                 for r in {(height - 1) // 2, height // 2}
+                                 for c in {(width - 1) // 2, width // 2})
+    return _tables[key]
+
+
+def weighted_mobility(game, player, weights):
+    """Return the sum of the `weights` of the cells `player` can move to."""
+    return sum(weights[r][c] for r, c in game.get_legal_moves(player, shuffle=False))
+
+
+def degree_score(game, player, power=1, center_bonus=0.):
+    """Calculate the heuristic value of a game state from the point of view
+    of the given player: the difference between the `degree_weights()` of
+    the player's legal moves and those of its opponent's legal moves.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : object
+        A player instance in the current game.
+
+    power : int (optional)
+        The power of the degrees used as weights; higher powers favour moves
+        into the open middle of the board more strongly.
+
+    center_bonus : float (optional)
+        Added to the weights of the player if it can move to a central cell
+        of the board (see `center_cells()`), or else to the weights of its
+        opponent if it can.
+
+    Returns
+    -------
+    float
+        The heuristic value of the current game state to the specified player.
+    """
+    _, _, utility = game.mobility(player)
+    if utility:
+        return utility
+
+    weights = degree_weights(game.width, game.height, power)
+    opponent = game.get_opponent(player)
+    own_factor = weighted_mobility(game, player, weights)
+    opp_factor = weighted_mobility(game, opponent, weights)
+
+    if center_bonus:
+        center = center_cells(game.width, game.height)
+        if not center.isdisjoint(game.get_legal_moves(player, shuffle=False)):
+            own_factor += center_bonus
+        elif not center.isdisjoint(game.get_legal_moves(opponent, shuffle=False)):
+            opp_factor += center_bonus
+
+    return own_factor - opp_factor
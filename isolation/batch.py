@@ -0,0 +1,424 @@
+"""
+This file contains the `BatchBoard` class, which plays many independent games
+of knight-move Isolation at once by storing them in NumPy arrays, together
+with a set of vectorized agents that choose moves for every game in the batch
+with a handful of array operations.
+
+The batch engine is meant for generating large numbers of games (self-play,
+baselines) where the per-game Python overhead of `Board` is the bottleneck.
+It requires NumPy, which the rest of the `isolation` package does not, so it
+is not imported by `isolation/__init__.py`:
+
+    from isolation.batch import BatchBoard, play_batch
+
+Cells are numbered `row + column * height`, the same as in `Board`.
+"""
+import timeit
+
+import numpy as np
+
+from .isolation import Board, TIME_LIMIT_MILLIS
+
+
+class BatchBoard(object):
+    """Hold `n` games of Isolation on boards of the same size.
+
+    Every game starts from the empty board with player 1 to move. Moves are
+    applied to all games together by `apply_moves()`; games that are over
+    (or that are given the move -1) are left unchanged. A game can also end
+    by its active player forfeiting (see `forfeit()`).
+
+    Parameters
+    ----------
+    n : int
+        The number of games in the batch.
+
+    width : int (optional)
+        The number of columns of every board.
+
+    height : int (optional)
+        The number of rows of every board.
+
+    Attributes
+    ----------
+    blanks : numpy.ndarray of bool, shape (n, width * height)
+        True for every open cell of every game.
+
+    locs : numpy.ndarray of int, shape (n, 2)
+        The cell index of player 1 (column 0) and player 2 (column 1) in
+        every game, or NOT_MOVED_IDX if the player has not moved yet.
+
+    move_count : numpy.ndarray of int, shape (n,)
+        The number of moves applied to every game. Player 1 is active when it
+        is even and player 2 when it is odd.
+
+    history : numpy.ndarray of int, shape (n, width * height)
+        The cell index of every move applied to every game, in order, padded
+        with NOT_MOVED_IDX.
+
+    forfeits : numpy.ndarray of bool, shape (n,)
+        True for every game lost by its active player forfeiting.
+    """
+    # (width, height) -> (adjacency matrix, neighbor slots, slot validity)
+    _tables = {}
+
+    def __init__(self, n, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.adjacency, self.neighbors, self.neighbor_valid = \
+            BatchBoard._get_tables(width, height)
+        cells = width * height
+        self.blanks = np.ones((n, cells), dtype=bool)
+        self.locs = np.full((n, 2), Board.NOT_MOVED_IDX, dtype=np.intp)
+        self.move_count = np.zeros(n, dtype=np.intp)
+        self.history = np.full((n, cells), Board.NOT_MOVED_IDX, dtype=np.intp)
+        self.forfeits = np.zeros(n, dtype=bool)
+
+    @classmethod
+    def _get_tables(cls, width, height):
+        """Return the knight move tables for a board of the given size,
+        building them from the `Board` neighbor table on first use.
+
+        The tables are a (cells, cells) boolean adjacency matrix and a
+        (cells, 8) array of destination cells padded with 0, together with a
+        (cells, 8) boolean array marking the slots that hold a real move.
+        """
+        key = (width, height)
+        if key not in cls._tables:
+            cells = width * height
+            adjacency = np.zeros((cells, cells), dtype=bool)
+            neighbors = np.zeros((cells, 8), dtype=np.intp)
+            valid = np.zeros((cells, 8), dtype=bool)
+            for idx, moves in enumerate(Board._get_neighbors(width, height)):
+                for slot, (dest, _) in enumerate(moves):
+                    adjacency[idx, dest] = True
+                    neighbors[idx, slot] = dest
+                    valid[idx, slot] = True
+            cls._tables[key] = (adjacency, neighbors, valid)
+        return cls._tables[key]
+
+    def __len__(self):
+        return len(self.move_count)
+
+    @property
+    def active(self):
+        """The index (0 for player 1, 1 for player 2) of the active player in
+        every game.
+        """
+        return self.move_count & 1
+
+    def legal_moves(self, player=None):
+        """Return an (n, cells) boolean array marking the legal moves of the
+        specified player (0 or 1; the active player of each game if None) in
+        every game.
+        """
+        if player is None:
+            player = self.active
+        locs = self.locs[np.arange(len(self)), player]
+        return _legal_moves(self.adjacency, self.blanks, locs)
+
+    def count_legal_moves(self, player=None):
+        """Return the number of legal moves of the specified player (0 or 1;
+        the active player of each game if None) in every game.
+        """
+        return self.legal_moves(player).sum(axis=1)
+
+    def winners(self):
+        """Return the index of the winning player (0 or 1) of every game, or
+        -1 for the games that are still in progress.
+        """
+        over = ~self.legal_moves().any(axis=1) | self.forfeits
+        return np.where(over, 1 - self.active, -1)
+
+    def forfeit(self, games):
+        """End the given games (an index array or boolean mask) as lost by
+        their active player, e.g. for choosing an illegal move.
+        """
+        self.forfeits[games] = True
+
+    def apply_moves(self, moves):
+        """Move the active player of every game to the given cell.
+
+        Parameters
+        ----------
+        moves : array-like of int, shape (n,)
+            The destination cell index for every game; games given -1 are
+            skipped. The moves are assumed to be legal.
+        """
+        moves = np.asarray(moves, dtype=np.intp)
+        games = np.flatnonzero((moves >= 0) & ~self.forfeits)
+        dests = moves[games]
+        self.blanks[games, dests] = False
+        self.locs[games, self.move_count[games] & 1] = dests
+        self.history[games, self.move_count[games]] = dests
+        self.move_count[games] += 1
+
+    def to_board(self, i, player_1, player_2):
+        """Return game `i` of the batch as an `isolation.Board` between the
+        given players, by replaying its move history.
+        """
+        game = Board(player_1, player_2, self.width, self.height)
+        for idx in self.history[i, :self.move_count[i]]:
+            game.apply_move((int(idx) % self.height, int(idx) // self.height))
+        return game
+
+
+def _legal_moves(adjacency, blanks, locs):
+    """Return the (n, cells) legal move mask for players at the cell indices
+    `locs` (NOT_MOVED_IDX for unplaced players) on the boards `blanks`.
+    """
+    moved = locs >= 0
+    moves = adjacency[np.where(moved, locs, 0)] & blanks
+    moves[~moved] = blanks[~moved]
+    return moves
+
+
+def null_scores(batch, blanks, locs, player):
+    """Vectorized `sample_players.null_score` for the states given by the
+    `blanks` and `locs` arrays, from the point of view of `player` (0 or 1).
+    Terminal states are scored by the search, so this is always zero.
+    """
+    return np.zeros(len(blanks))
+
+
+def open_move_scores(batch, blanks, locs, player):
+    """Vectorized `sample_players.open_move_score`."""
+    own = _legal_moves(batch.adjacency, blanks, locs[:, player]).sum(axis=1)
+    return own.astype(float)
+
+
+def improved_scores(batch, blanks, locs, player):
+    """Vectorized `sample_players.improved_score`."""
+    own = _legal_moves(batch.adjacency, blanks, locs[:, player]).sum(axis=1)
+    opp = _legal_moves(batch.adjacency, blanks, locs[:, 1 - player]).sum(axis=1)
+    return (own - opp).astype(float)
+
+
+def center_scores(batch, blanks, locs, player):
+    """Vectorized `sample_players.center_score`."""
+    loc = locs[:, player]
+    y, x = loc % batch.height, loc // batch.height
+    w, h = batch.width / 2., batch.height / 2.
+    return (h - y) ** 2 + (w - x) ** 2
+
+
+SCORES = {
+    "null": null_scores,
+    "open": open_move_scores,
+    "improved": improved_scores,
+    "center": center_scores,
+}
+
+
+class RandomAgent(object):
+    """Vectorized `sample_players.RandomPlayer`: choose a legal move uniformly
+    at random in every game.
+
+    Parameters
+    ----------
+    seed : int (optional)
+        Seed for the agent's NumPy random generator.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def get_moves(self, batch):
+        """Return the chosen cell index for every game in the batch, or -1 for
+        the games where the active player has no legal moves.
+        """
+        legal = batch.legal_moves()
+        keys = np.where(legal, self.rng.random(legal.shape), -1.)
+        return np.where(legal.any(axis=1), keys.argmax(axis=1), -1)
+
+
+class MinimaxAgent(object):
+    """Vectorized fixed-depth minimax agent, equivalent to
+    `game_agent.MinimaxPlayer` with one of the sample score functions. A
+    depth of one gives the `sample_players.GreedyPlayer`.
+
+    The search expands every game of the batch level by level: each state is
+    replicated once per knight move slot, the valid children are compacted
+    into a new set of arrays, and the child values are folded back with a
+    masked max or min. Terminal states are worth +/-inf to the searching
+    player, like `Board.utility`. Both players must already be placed on the
+    board (as they are after the random opening used by `tournament.py`).
+
+    Parameters
+    ----------
+    search_depth : int (optional)
+        The number of plies to search; must be at least 1.
+
+    score : str (optional)
+        The name of the score function in `SCORES`.
+    """
+
+    def __init__(self, search_depth=3, score="improved"):
+        self.search_depth = search_depth
+        self.score = SCORES[score]
+
+    def get_moves(self, batch):
+        """Return the chosen cell index for every game in the batch, or -1 for
+        the games where the active player has no legal moves.
+        """
+        if (batch.locs < 0).any():
+            raise ValueError("MinimaxAgent requires both players to be placed.")
+        active = batch.active
+        values, valid = self._expand(batch, batch.blanks, batch.locs, active,
+                                     active, self.search_depth)
+        playable = valid.any(axis=1)
+        values = np.where(valid, values, -np.inf)
+        slots = values.argmax(axis=1)
+        # where every move loses, any legal move will do
+        lost = values.max(axis=1) == -np.inf
+        slots[lost] = valid[lost].argmax(axis=1)
+        loc = batch.locs[np.arange(len(batch)), active]
+        return np.where(playable, batch.neighbors[loc, slots], -1)
+
+    def _expand(self, batch, blanks, locs, active, root, depth):
+        """Search `depth` plies below each of the m states given.
+
+        Returns an (m, 8) array with the minimax value (for the `root` player
+        of each state) of the child reached through every knight move slot,
+        and the (m, 8) mask of the slots that hold a legal move. Empty slots
+        hold -inf at max nodes and +inf at min nodes, so folding a row with
+        max or min also gives the correct utility for states without moves.
+        """
+        rows = np.arange(len(blanks))
+        loc = locs[rows, active]
+        dests = batch.neighbors[loc]
+        valid = batch.neighbor_valid[loc] & blanks[rows[:, None], dests]
+
+        parent, slot = np.nonzero(valid)
+        children = np.arange(len(parent))
+        dest = dests[parent, slot]
+        child_blanks = blanks[parent]
+        child_blanks[children, dest] = False
+        child_locs = locs[parent]
+        child_locs[children, active[parent]] = dest
+        child_active = 1 - active[parent]
+        child_root = root[parent]
+
+        if depth == 1:
+            child_values = self._evaluate(batch, child_blanks, child_locs,
+                                          child_active, child_root)
+        else:
+            grandchildren, _ = self._expand(batch, child_blanks, child_locs,
+                                            child_active, child_root, depth - 1)
+            child_values = np.where(child_active == child_root,
+                                    grandchildren.max(axis=1),
+                                    grandchildren.min(axis=1))
+
+        empty = np.where(active == root, -np.inf, np.inf)
+        values = np.repeat(empty[:, None], 8, axis=1)
+        values[parent, slot] = child_values
+        return values, valid
+
+    def _evaluate(self, batch, blanks, locs, active, root):
+        """Return the score of the given leaf states for their root player,
+        replacing it with +/-inf where the active player cannot move.
+        """
+        values = np.empty(len(blanks))
+        for player in (0, 1):
+            games = root == player
+            values[games] = self.score(batch, blanks[games], locs[games], player)
+        rows = np.arange(len(blanks))
+        stuck = ~_legal_moves(batch.adjacency, blanks, locs[rows, active]).any(axis=1)
+        values[stuck] = np.where(active[stuck] == root[stuck], -np.inf, np.inf)
+        return values
+
+
+class PlayerAgent(object):
+    """Adapt a regular player object (anything with a `get_move(game,
+    time_left)` method, e.g. `game_agent.AlphaBetaPlayer`) to the batch agent
+    interface. Every game in the batch is rebuilt as an `isolation.Board` and
+    handed to the player in turn, so this gives no speedup by itself, but it
+    lets any agent play against the vectorized ones.
+
+    Parameters
+    ----------
+    player : object
+        The player to ask for moves.
+
+    time_limit : numeric (optional)
+        The number of milliseconds the player is given for each move. The
+        player sees a running clock as in `Board.play`, but overrunning it is
+        not penalized.
+    """
+
+    def __init__(self, player, time_limit=TIME_LIMIT_MILLIS):
+        self.player = player
+        self.time_limit = time_limit
+        self._opponent = object()
+
+    def get_moves(self, batch):
+        """Return the move chosen by the player for every game in the batch,
+        or -1 for the games that are over (the active player has no legal
+        moves, or a game was forfeited) and where the player did not return a
+        legal move (such as None or (-1, -1)).
+        """
+        moves = np.full(len(batch), -1, dtype=np.intp)
+        playable = batch.legal_moves().any(axis=1) & ~batch.forfeits
+        for i in np.flatnonzero(playable):
+            if batch.move_count[i] & 1:
+                game = batch.to_board(i, self._opponent, self.player)
+            else:
+                game = batch.to_board(i, self.player, self._opponent)
+            move_start = 1000 * timeit.default_timer()
+            time_left = lambda: self.time_limit - (
+                1000 * timeit.default_timer() - move_start)
+            move = self.player.get_move(game, time_left)
+            if move in game.get_legal_moves(shuffle=False):
+                moves[i] = move[0] + move[1] * batch.height
+        return moves
+
+
+def play_batch(agent_1, agent_2, n, width=7, height=7, opening_plies=2,
+               seed=None):
+    """Play `n` games between two batch agents in lockstep and return the
+    index of the winner (0 for `agent_1`, 1 for `agent_2`) of every game.
+
+    Like `tournament.play_round`, every game starts with `opening_plies`
+    random moves (drawn independently for each game) before the agents take
+    over. Time limits are not enforced. An agent that does not return a
+    legal move for a game in progress (including -1) forfeits that game.
+
+    Parameters
+    ----------
+    agent_1, agent_2 : object
+        Batch agents (with a `get_moves(batch)` method, such as `RandomAgent`,
+        `MinimaxAgent` or `PlayerAgent`) playing as player 1 and player 2.
+
+    n : int
+        The number of games to play.
+
+    width, height : int (optional)
+        The size of the boards.
+
+    opening_plies : int (optional)
+        The number of random moves applied to every game before play starts.
+
+    seed : int (optional)
+        Seed for the random opening moves.
+
+    Returns
+    -------
+    (numpy.ndarray, BatchBoard)
+        The winner of every game, and the batch holding the final positions.
+    """
+    batch = BatchBoard(n, width, height)
+    opening = RandomAgent(seed)
+    for _ in range(opening_plies):
+        batch.apply_moves(opening.get_moves(batch))
+
+    agents = (agent_1, agent_2)
+    winners = batch.winners()
+    while (winners < 0).any():
+        moves = agents[batch.move_count[winners < 0][0] & 1].get_moves(batch)
+        cells = np.clip(moves, 0, batch.width * batch.height - 1)
+        legal = (moves == cells) & batch.legal_moves()[np.arange(n), cells]
+        batch.forfeit((winners < 0) & ~legal)
+        moves[(winners >= 0) | ~legal] = -1
+        batch.apply_moves(moves)
+        winners = batch.winners()
+    return winners, batch
@@ -0,0 +1,246 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that keeps the open cells and the player locations as integer
+bitmasks instead of a list with one entry per cell.
+
+`BitBoard` is a drop-in replacement for `Board`: it accepts the same
+constructor arguments and implements the same public methods with the same
+results, so any player written against `Board` can be used unchanged.
+"""
+import random
+
+from .isolation import Board
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, storing the board as bitmasks.
+
+    Bit `i` of the blank mask is set while cell `i` is open, where cells are
+    numbered `row + column * height` just like the `Board` state list. The
+    knight moves available from every cell are precomputed once per board
+    size, so generating the legal moves of a player is a single `and` of two
+    integers followed by a lookup of the resulting mask in a table of move
+    tuples. `mobility()` and `count_legal_moves()` count the moves the same
+    way, and the blank mask is the only record of the open cells.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    seed : hashable (optional)
+        Seed for the random number generator used to shuffle legal moves.
+    """
+    __slots__ = ('_masks', '_move_tuples')
+
+    # (width, height) -> (knight move mask per cell, {destination mask:
+    # tuple of (row, column) moves})
+    _tables = {}
+
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        self._masks, self._move_tuples = BitBoard._get_tables(width, height)
+        self._coords = Board._get_coords(width, height)
+        self._blanks = (1 << (width * height)) - 1
+        self._p1_loc = Board.NOT_MOVED_IDX
+        self._p2_loc = Board.NOT_MOVED_IDX
+        self._zobrist = Board._get_zobrist(width, height)
+        self._hash = 0
+        self._undo_stack = []
+        self._rng = random.Random(seed)
+        self._p1_moves = None
+        self._p2_moves = None
+
+    @classmethod
+    def _get_tables(cls, width, height):
+        """Return the knight move masks and move tuple cache for a board of
+        the given size, building them on first use.
+
+        The move tuple cache maps each distinct set of open knight
+        destinations (at most 256 per cell) to its tuple of moves, so move
+        generation usually ends in a single dictionary lookup.
+        """
+        key = (width, height)
+        if key not in cls._tables:
+            cls._tables[key] = (Board._get_neighbor_masks(width, height), {})
+        return cls._tables[key]
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
+        new_board._active_player = self._active_player
+        new_board._inactive_player = self._inactive_player
+        new_board._masks = self._masks
+        new_board._coords = self._coords
+        new_board._move_tuples = self._move_tuples
+        new_board._blanks = self._blanks
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._zobrist = self._zobrist
+        new_board._hash = self._hash
+        new_board._undo_stack = list(self._undo_stack)
+        new_board._rng = self._rng
+        new_board._p1_moves = self._p1_moves
+        new_board._p2_moves = self._p2_moves
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        r, c = move
+        return (0 <= r < self.height and 0 <= c < self.width and
+                bool(self._blanks >> (r + c * self.height) & 1))
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        blocked_keys, p1_keys, p2_keys, initiative_key = self._zobrist
+        if self._active_player == self._player_2:
+            if self._p2_loc != Board.NOT_MOVED_IDX:
+                self._hash ^= p2_keys[self._p2_loc]
+            self._hash ^= p2_keys[idx]
+            self._undo_stack.append(self._p2_loc)
+            self._p2_loc = idx
+        else:
+            if self._p1_loc != Board.NOT_MOVED_IDX:
+                self._hash ^= p1_keys[self._p1_loc]
+            self._hash ^= p1_keys[idx]
+            self._undo_stack.append(self._p1_loc)
+            self._p1_loc = idx
+        if self._blanks >> idx & 1:
+            self._hash ^= blocked_keys[idx]
+        self._hash ^= initiative_key
+        self._blanks &= ~(1 << idx)
+        self._p1_moves = self._p2_moves = None
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def undo_move(self):
+        """Revert the most recent call to apply_move() in-place, restoring the
+        previous game state exactly (including its hash).
+
+        Only legal moves (onto blank cells) can be undone. Raises a
+        RuntimeError if there is no move to undo.
+        """
+        if not self._undo_stack:
+            raise RuntimeError("There is no move to undo on this board.")
+        blocked_keys, p1_keys, p2_keys, initiative_key = self._zobrist
+        last_idx = self._undo_stack.pop()
+        if self._inactive_player == self._player_2:
+            idx = self._p2_loc
+            self._hash ^= p2_keys[idx]
+            if last_idx != Board.NOT_MOVED_IDX:
+                self._hash ^= p2_keys[last_idx]
+            self._p2_loc = last_idx
+        else:
+            idx = self._p1_loc
+            self._hash ^= p1_keys[idx]
+            if last_idx != Board.NOT_MOVED_IDX:
+                self._hash ^= p1_keys[last_idx]
+            self._p1_loc = last_idx
+        self._hash ^= blocked_keys[idx] ^ initiative_key
+        self._blanks |= 1 << idx
+        self._p1_moves = self._p2_moves = None
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
+    def _set_state(self, blocked, p1_loc, p2_loc, initiative, move_count):
+        """Replace the state of this (new) board with the given blocked cell
+        mask, player cell indices, initiative and move count, and recompute
+        the hash.
+        """
+        self._blanks = ~blocked & ((1 << (self.width * self.height)) - 1)
+        self._reset_state(p1_loc, p2_loc, initiative, move_count)
+
+    def count_legal_moves(self, player=None):
+        """Return the number of legal moves for the specified player (the
+        active player if None) from the bitmasks, without building a move
+        tuple.
+        """
+        return self._count_moves(self._location_idx(player))
+
+    def mobility(self, player):
+        """Return the number of legal moves of the specified player and of
+        its opponent, together with the utility of the current state for the
+        player (see `Board.mobility()`), counted from the bitmasks.
+        """
+        if player == self._player_1:
+            own_moves = self._count_moves(self._p1_loc)
+            opp_moves = self._count_moves(self._p2_loc)
+        elif player == self._player_2:
+            own_moves = self._count_moves(self._p2_loc)
+            opp_moves = self._count_moves(self._p1_loc)
+        else:
+            raise RuntimeError(
+                "Invalid player in mobility: {}".format(player))
+        if player == self._active_player:
+            if not own_moves:
+                return own_moves, opp_moves, float("-inf")
+        elif not opp_moves:
+            return own_moves, opp_moves, float("inf")
+        return own_moves, opp_moves, 0.
+
+    def _count_moves(self, loc_idx):
+        """Return the number of knight moves from the cell index `loc_idx`
+        (every open cell for a player that has not moved).
+        """
+        return len(self._generate_moves(loc_idx))
+
+    def _generate_moves(self, loc_idx):
+        """Generate the tuple of possible knight moves from the cell index
+        `loc_idx`, in increasing cell order.
+
+        A player that has not moved can move to any open cell; those tuples
+        are cached along with the knight moves, which only adds the few
+        blank masks seen before both players are placed.
+        """
+        if loc_idx == Board.NOT_MOVED_IDX:
+            mask = self._blanks
+        else:
+            mask = self._masks[loc_idx] & self._blanks
+        moves = self._move_tuples.get(mask)
+        if moves is None:
+            moves = self._move_tuples[mask] = tuple(self._unpack(mask))
+        return moves
@@ -8,11 +8,22 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 import random
+import struct
 import timeit
 from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+# Header of a serialized board: width, height, move count, initiative (0 for
+# player 1, 1 for player 2), player 1 and player 2 cell index (-1 if not
+# moved); followed by the blocked cells as a little-endian bitmap
+_HEADER = struct.Struct("<BBHBhh")
+
+
+class _SolverAbort(Exception):
+    """Raised inside Board.longest_path() when its `stop` callback fires."""
+    pass
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,11 +44,52 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    seed : hashable (optional)
+        Seed for the random number generator used to shuffle legal moves.
+        Boards built with the same seed (and copies of them) shuffle moves
+        in the same order; the default of None seeds from system entropy.
     """
+    __slots__ = ('width', 'height', 'move_count', '_player_1', '_player_2',
+                 '_active_player', '_inactive_player', '_cells', '_blanks',
+                 '_p1_loc', '_p2_loc', '_neighbors', '_coords', '_zobrist',
+                 '_hash', '_undo_stack', '_rng', '_p1_moves', '_p2_moves')
+
     BLANK = 0
     NOT_MOVED = None
+    # Cell index stored for a player that has not been placed on the board
+    NOT_MOVED_IDX = -1
+
+    # (width, height) -> for each cell index, the (index, (row, column))
+    # pairs of every in-bounds knight move from that cell
+    _neighbor_tables = {}
+
+    # (width, height) -> for each cell index, the mask of every cell a
+    # knight can reach from that cell
+    _neighbor_mask_tables = {}
+
+    # (width, height) -> the (row, column) coordinates of every cell index
+    _coord_tables = {}
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    # (width, height) -> the cell permutation of every symmetry of the board
+    # (rotations and reflections mapping the board onto itself), identity
+    # first
+    _symmetry_tables = {}
+
+    # (width, height) -> (the inverse of every symmetry permutation, the
+    # Zobrist keys of every symmetry with the cells permuted accordingly,
+    # the combined key of all cells being blocked)
+    _canonical_tables = {}
+
+    # Number of entries at which a memo passed to longest_path() is cleared
+    PATH_MEMO_SIZE = 1 << 16
+
+    # (width, height) -> Zobrist keys (blocked cell keys, player 1 location
+    # keys, player 2 location keys, player 2 initiative key)
+    _zobrist_tables = {}
+    ZOBRIST_SEED = 0x150
+
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None):
         #print("in Board.__init__()")
         self.width = width
         self.height = height
@@ -47,15 +99,219 @@ class Board(object):
         self._active_player = player_1
         self._inactive_player = player_2
 
-        # The last 3 entries of the board state includes initiative (0 for
-        # player 1, 1 for player 2) player 2 last move, and player 1 last move
-        self._board_state = [Board.BLANK] * (width * height + 3)
-        self._board_state[-1] = Board.NOT_MOVED
-        self._board_state[-2] = Board.NOT_MOVED
+        # One byte per cell (BLANK or blocked), indexed row + column * height,
+        # an integer with bit i set while cell i is open (kept in step with
+        # the cells by apply_move() and undo_move()), and the cell index of
+        # each player's last move
+        self._cells = bytearray(width * height)
+        self._blanks = (1 << (width * height)) - 1
+        self._p1_loc = Board.NOT_MOVED_IDX
+        self._p2_loc = Board.NOT_MOVED_IDX
+        self._neighbors = Board._get_neighbors(width, height)
+        self._coords = Board._get_coords(width, height)
+        self._zobrist = Board._get_zobrist(width, height)
+        self._hash = 0
+
+        # Location each mover held before every applied move, for undo_move()
+        self._undo_stack = []
+
+        # Shared with every copy of this board
+        self._rng = random.Random(seed)
+
+        # Memoized legal moves of each player in the current state (None
+        # until generated); cleared by apply_move() and undo_move()
+        self._p1_moves = None
+        self._p2_moves = None
+
+    @classmethod
+    def _get_neighbors(cls, width, height):
+        """Return the knight move table for a board of the given size,
+        building it on first use.
+
+        Entry `i` of the table is a tuple holding an `(index, (row, column))`
+        pair for every cell a knight standing on cell `i` can reach.
+        """
+        key = (width, height)
+        if key not in cls._neighbor_tables:
+            directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                          (1, -2), (1, 2), (2, -1), (2, 1)]
+            table = []
+            for idx in range(width * height):
+                r, c = idx % height, idx // height
+                table.append(tuple(
+                    (r + dr + (c + dc) * height, (r + dr, c + dc))
+                    for dr, dc in directions
+                    if 0 <= r + dr < height and 0 <= c + dc < width))
+            cls._neighbor_tables[key] = table
+        return cls._neighbor_tables[key]
+
+    @classmethod
+    def _get_neighbor_masks(cls, width, height):
+        """Return, for a board of the given size, the mask of the cells a
+        knight can reach from every cell index, building them on first use.
+        """
+        key = (width, height)
+        if key not in cls._neighbor_mask_tables:
+            cls._neighbor_mask_tables[key] = tuple(
+                sum(1 << i for i, _ in cells)
+                for cells in cls._get_neighbors(width, height))
+        return cls._neighbor_mask_tables[key]
+
+    @classmethod
+    def _get_coords(cls, width, height):
+        """Return the (row, column) coordinates of every cell index for a
+        board of the given size, building them on first use.
+        """
+        key = (width, height)
+        if key not in cls._coord_tables:
+            cls._coord_tables[key] = tuple(
+                (idx % height, idx // height) for idx in range(width * height))
+        return cls._coord_tables[key]
+
+    @classmethod
+    def _get_symmetries(cls, width, height):
+        """Return the symmetries of a board of the given size as cell index
+        permutations, building them on first use.
+
+        Every board has 4 symmetries (identity, row flip, column flip and
+        half turn); square boards have 4 more (transpose, anti-transpose
+        and quarter turns). Entry `i` of a permutation is the cell that cell
+        `i` is mapped to. The identity comes first.
+        """
+        key = (width, height)
+        if key not in cls._symmetry_tables:
+            h, w = height - 1, width - 1
+            transforms = [lambda r, c: (r, c),
+                          lambda r, c: (h - r, c),
+                          lambda r, c: (r, w - c),
+                          lambda r, c: (h - r, w - c)]
+            if width == height:
+                transforms += [lambda r, c: (c, r),
+                               lambda r, c: (w - c, h - r),
+                               lambda r, c: (c, h - r),
+                               lambda r, c: (w - c, r)]
+            coords = cls._get_coords(width, height)
+            cls._symmetry_tables[key] = [
+                tuple(r2 + c2 * height for r2, c2 in
+                      (transform(r, c) for r, c in coords))
+                for transform in transforms]
+        return cls._symmetry_tables[key]
+
+    @classmethod
+    def _get_zobrist(cls, width, height):
+        """Return the Zobrist keys for a board of the given size, building
+        them on first use.
+
+        The keys are drawn from a generator with a fixed seed, so every board
+        of the same size (in any process) hashes a position to the same value.
+        """
+        key = (width, height)
+        if key not in cls._zobrist_tables:
+            rng = random.Random(cls.ZOBRIST_SEED + width * 1000 + height)
+            size = width * height
+            cls._zobrist_tables[key] = (
+                tuple(rng.getrandbits(64) for _ in range(size)),
+                tuple(rng.getrandbits(64) for _ in range(size)),
+                tuple(rng.getrandbits(64) for _ in range(size)),
+                rng.getrandbits(64))
+        return cls._zobrist_tables[key]
+
+    @classmethod
+    def _get_canonical_tables(cls, width, height):
+        """Return the tables used by canonical_hash() and map_move() for a
+        board of the given size, building them on first use.
+        """
+        key = (width, height)
+        if key not in cls._canonical_tables:
+            perms = cls._get_symmetries(width, height)
+            blocked_keys, p1_keys, p2_keys, _ = cls._get_zobrist(width, height)
+            inverses = []
+            for perm in perms:
+                inverse = [0] * len(perm)
+                for idx, image in enumerate(perm):
+                    inverse[image] = idx
+                inverses.append(tuple(inverse))
+            keys = [tuple(tuple(table[image] for image in perm)
+                          for table in (blocked_keys, p1_keys, p2_keys))
+                    for perm in perms]
+            all_blocked = 0
+            for k in blocked_keys:
+                all_blocked ^= k
+            cls._canonical_tables[key] = (inverses, keys, all_blocked)
+        return cls._canonical_tables[key]
 
     def hash(self):
         #print("in Board.hash()")
-        return str(self._board_state).__hash__()
+        """Return a 64-bit Zobrist hash of the current game state.
+
+        The hash covers the blocked cells, the location of each player and
+        which player holds the initiative. It is maintained incrementally by
+        apply_move(), so calling this method is O(1).
+        """
+        return self._hash
+
+    def canonical_hash(self):
+        #print("in Board.canonical_hash()")
+        """Return a hash of the current game state that is the same for all
+        of its rotations and reflections, and the symmetry that maps the
+        state onto its canonical orientation.
+
+        The key is the smallest hash() over the symmetric images of the state
+        (8 on square boards, 4 otherwise), so symmetric positions can share
+        entries in transposition tables, evaluation caches and opening books.
+        Moves stored for the canonical orientation are mapped back with
+        `map_move(move, symmetry, inverse=True)`.
+
+        The cost grows with the smaller of the number of blocked and open
+        cells, so this is cheapest early in the game.
+
+        Returns
+        -------
+        (int, int)
+            The canonical key and the index of the symmetry.
+        """
+        _, keys, all_blocked = Board._get_canonical_tables(self.width, self.height)
+        blocked = self._blocked_mask()
+        base = 0
+        if bin(blocked).count("1") * 2 > self.width * self.height:
+            # XOR in the keys of the open cells into the key of a fully
+            # blocked board instead
+            blocked = self._blanks
+            base = all_blocked
+        cells = []
+        while blocked:
+            low = blocked & -blocked
+            cells.append(low.bit_length() - 1)
+            blocked ^= low
+
+        if self._active_player == self._player_2:
+            base ^= self._zobrist[3]
+        p1_loc, p2_loc = self._p1_loc, self._p2_loc
+        best_key, best_symmetry = None, 0
+        for symmetry, (blocked_keys, p1_keys, p2_keys) in enumerate(keys):
+            key = base
+            for idx in cells:
+                key ^= blocked_keys[idx]
+            if p1_loc != Board.NOT_MOVED_IDX:
+                key ^= p1_keys[p1_loc]
+            if p2_loc != Board.NOT_MOVED_IDX:
+                key ^= p2_keys[p2_loc]
+            if best_key is None or key < best_key:
+                best_key, best_symmetry = key, symmetry
+        return best_key, best_symmetry
+
+    def map_move(self, move, symmetry, inverse=False):
+        #print("in Board.map_move()")
+        """Return the image of `move` under the symmetry returned by
+        canonical_hash(), i.e., the same move in the canonical orientation;
+        with `inverse` set, map a move of the canonical orientation back to
+        the orientation of this board.
+        """
+        if inverse:
+            perm = Board._get_canonical_tables(self.width, self.height)[0][symmetry]
+        else:
+            perm = Board._get_symmetries(self.width, self.height)[symmetry]
+        return self._coords[perm[move[0] + move[1] * self.height]]
 
     @property
     def active_player(self):
@@ -98,11 +354,26 @@ class Board(object):
     def copy(self):
         #print("in Board.copy()")
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
-        new_board._board_state = copy(self._board_state)
+        new_board._cells = self._cells[:]
+        new_board._blanks = self._blanks
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._neighbors = self._neighbors
+        new_board._coords = self._coords
+        new_board._zobrist = self._zobrist
+        new_board._hash = self._hash
+        new_board._undo_stack = copy(self._undo_stack)
+        new_board._rng = self._rng
+        new_board._p1_moves = self._p1_moves
+        new_board._p2_moves = self._p2_moves
         return new_board
 
     def forecast_move(self, move):
@@ -142,14 +413,13 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
-                self._board_state[idx] == Board.BLANK)
+                self._cells[idx] == Board.BLANK)
 
     def get_blank_spaces(self):
         #print("in Board.get_blank_spaces()")
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        return self._unpack(self._blanks)
 
     def get_player_location(self, player):
         #print("in Board.get_player_location()")
@@ -167,21 +437,19 @@ class Board(object):
             if the player has not moved.
         """
         if player == self._player_1:
-            if self._board_state[-1] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-1]
+            idx = self._p1_loc
         elif player == self._player_2:
-            if self._board_state[-2] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-2]
+            idx = self._p2_loc
         else:
             raise RuntimeError(
                 "Invalid player in get_player_location: {}".format(player))
+        if idx == Board.NOT_MOVED_IDX:
+            return Board.NOT_MOVED
         w = idx // self.height
         h = idx % self.height
         return (h, w)
 
-    def get_legal_moves(self, player=None):
+    def get_legal_moves(self, player=None, shuffle=True, distinct=False):
         #print("in Board.get_legal_moves()")
         """Return the list of all legal moves for the specified player.
 
@@ -191,6 +459,17 @@ class Board(object):
             An object registered as a player in the current game. If None,
             return the legal moves for the active player on the board.
 
+        shuffle : bool (optional)
+            If True, knight moves are returned in random order drawn from the
+            board's generator. If False, they are returned in a fixed order,
+            which is cheaper and suits callers that order moves themselves.
+
+        distinct : bool (optional)
+            If True and the position is symmetric (a rotation or reflection
+            of the board maps it onto itself, as is common before both
+            players have moved), return only one move out of every set of
+            moves that lead to symmetric, hence equally valued, positions.
+
         Returns
         -------
         list<(int, int)>
@@ -198,8 +477,113 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+            player = self._active_player
+        valid_moves = list(self._player_moves(player))
+        if distinct:
+            symmetries = self._symmetries_of_position()
+            if symmetries:
+                height = self.height
+                valid_moves = [
+                    move for move in valid_moves
+                    if all(move[0] + move[1] * height <= perm[move[0] + move[1] * height]
+                           for perm in symmetries)]
+        if shuffle and self._location_idx(player) != Board.NOT_MOVED_IDX:
+            self._rng.shuffle(valid_moves)
+        return valid_moves
+
+    def _symmetries_of_position(self):
+        """Return the board symmetries, other than the identity, that map the
+        current position (blocked cells and both player locations) onto
+        itself.
+        """
+        p1_loc, p2_loc = self._p1_loc, self._p2_loc
+        blocked = self._blocked_mask()
+        symmetries = []
+        for perm in Board._get_symmetries(self.width, self.height)[1:]:
+            if p1_loc != Board.NOT_MOVED_IDX and perm[p1_loc] != p1_loc:
+                continue
+            if p2_loc != Board.NOT_MOVED_IDX and perm[p2_loc] != p2_loc:
+                continue
+            mask = blocked
+            while mask:
+                low = mask & -mask
+                if not blocked >> perm[low.bit_length() - 1] & 1:
+                    break
+                mask ^= low
+            else:
+                symmetries.append(perm)
+        return symmetries
+
+    def count_legal_moves(self, player=None):
+        #print("in Board.count_legal_moves()")
+        """Return the number of legal moves for the specified player (the
+        active player if None) without building or shuffling a move list.
+        """
+        return len(self._player_moves(player))
+
+    def mobility(self, player):
+        #print("in Board.mobility()")
+        """Return the number of legal moves of the specified player and of
+        its opponent, together with the utility of the current state for the
+        player, from a single (memoized) move generation for each player.
+
+        Score functions can use this in place of separate is_loser(),
+        is_winner() and get_legal_moves() calls:
+
+            own_moves, opp_moves, utility = game.mobility(player)
+            if utility:
+                return utility
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int, float)
+            The legal move counts of `player` and of its opponent, and the
+            value of `utility(player)`.
+        """
+        opponent = self.get_opponent(player)
+        own_moves = len(self._player_moves(player))
+        opp_moves = len(self._player_moves(opponent))
+        if player == self._active_player:
+            if not own_moves:
+                return own_moves, opp_moves, float("-inf")
+        elif not opp_moves:
+            return own_moves, opp_moves, float("inf")
+        return own_moves, opp_moves, 0.
+
+    def _player_moves(self, player):
+        """Return the memoized tuple of legal moves for the specified player
+        (the active player if None) in the current state.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            if self._p1_moves is None:
+                self._p1_moves = self._generate_moves(self._p1_loc)
+            return self._p1_moves
+        elif player == self._player_2:
+            if self._p2_moves is None:
+                self._p2_moves = self._generate_moves(self._p2_loc)
+            return self._p2_moves
+        raise RuntimeError(
+            "Invalid player in _player_moves: {}".format(player))
+
+    def _location_idx(self, player):
+        """Return the cell index of the specified player (the active player if
+        None), or NOT_MOVED_IDX if the player has not been placed yet.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            return self._p1_loc
+        elif player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in _location_idx: {}".format(player))
 
     def apply_move(self, move):
         #print("in Board.apply_move()")
@@ -212,22 +596,67 @@ class Board(object):
             the active player on the board.
         """
         idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
-        self._board_state[-last_move_idx] = idx
-        self._board_state[idx] = 1
-        self._board_state[-3] ^= 1
+        blocked_keys, p1_keys, p2_keys, initiative_key = self._zobrist
+        if self._active_player == self._player_2:
+            last_idx = self._p2_loc
+            self._p2_loc = idx
+            loc_keys = p2_keys
+        else:
+            last_idx = self._p1_loc
+            self._p1_loc = idx
+            loc_keys = p1_keys
+        if last_idx != Board.NOT_MOVED_IDX:
+            self._hash ^= loc_keys[last_idx]
+        if self._cells[idx] == Board.BLANK:
+            self._hash ^= blocked_keys[idx]
+        self._hash ^= loc_keys[idx] ^ initiative_key
+        self._undo_stack.append(last_idx)
+        self._cells[idx] = 1
+        self._blanks &= ~(1 << idx)
+        self._p1_moves = self._p2_moves = None
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def undo_move(self):
+        #print("in Board.undo_move()")
+        """Revert the most recent call to apply_move() in-place, restoring the
+        previous game state exactly (including its hash).
+
+        Together with apply_move() this lets a search walk the game tree on a
+        single board instead of allocating a new board for every node with
+        forecast_move(). Only legal moves (onto blank cells) can be undone.
+        Raises a RuntimeError if there is no move to undo.
+        """
+        if not self._undo_stack:
+            raise RuntimeError("There is no move to undo on this board.")
+        blocked_keys, p1_keys, p2_keys, initiative_key = self._zobrist
+        last_idx = self._undo_stack.pop()
+        if self._inactive_player == self._player_2:
+            idx = self._p2_loc
+            self._p2_loc = last_idx
+            loc_keys = p2_keys
+        else:
+            idx = self._p1_loc
+            self._p1_loc = last_idx
+            loc_keys = p1_keys
+        if last_idx != Board.NOT_MOVED_IDX:
+            self._hash ^= loc_keys[last_idx]
+        self._hash ^= blocked_keys[idx] ^ loc_keys[idx] ^ initiative_key
+        self._cells[idx] = Board.BLANK
+        self._blanks |= 1 << idx
+        self._p1_moves = self._p2_moves = None
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
     def is_winner(self, player):
         #print("in Board.is_winner()")
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self.count_legal_moves(self._active_player)
 
     def is_loser(self, player):
         #print("in Board.is_loser()")
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self.count_legal_moves(self._active_player)
 
     def utility(self, player):
         #print("in Board.utility()")
@@ -252,7 +681,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.count_legal_moves(self._active_player):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -262,21 +691,260 @@ class Board(object):
 
         return 0.
 
-    def __get_moves(self, loc):
-        #print("in Board.__get_moves()")
-        """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+    def is_partitioned(self):
+        #print("in Board.is_partitioned()")
+        """Return True if both players have been placed and can no longer
+        reach any common cell, i.e., the open cells reachable by knight moves
+        from the two player locations form disjoint regions.
+
+        From then on the players cannot interfere with each other, and the
+        game is decided by the longest path each of them can walk in its own
+        region (see longest_path()): the active player wins if and only if
+        its longest path is strictly longer than its opponent's.
         """
-        if loc == Board.NOT_MOVED:
-            return self.get_blank_spaces()
+        if (self._p1_loc == Board.NOT_MOVED_IDX or
+                self._p2_loc == Board.NOT_MOVED_IDX):
+            return False
+        return not (self._reachable_mask(self._p1_loc) &
+                    self._reachable_mask(self._p2_loc))
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
-        return valid_moves
+    def longest_path(self, player=None, stop=None, memo=None):
+        #print("in Board.longest_path()")
+        """Return the longest sequence of moves the specified player (the
+        active player if None) can make from the current state if its
+        opponent never moves again.
+
+        This is an exact search, memoized on (location, open cells). Its
+        cost is exponential in the number of reachable cells, so it is meant
+        for the small regions left late in the game.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game, that has
+            been placed on the board.
+
+        stop : callable (optional)
+            Called every 1024 new states searched; the search is abandoned
+            as soon as it returns True.
+
+        memo : dict (optional)
+            The memo table, to keep it from one call to the next so that
+            later calls for positions along the same path are answered from
+            it. Only pass the same dict for boards of the same size; it is
+            cleared once it holds PATH_MEMO_SIZE entries. A new table is used
+            for every call by default.
+
+        Returns
+        -------
+        list<(int, int)> or None
+            The moves of a longest path, or None if the search was stopped.
+        """
+        loc = self._location_idx(player)
+        if loc == Board.NOT_MOVED_IDX:
+            raise RuntimeError("longest_path() requires a placed player.")
+        masks = Board._get_neighbor_masks(self.width, self.height)
+        if memo is None:
+            memo = {}
+        elif len(memo) >= Board.PATH_MEMO_SIZE:
+            memo.clear()
+        searched = [0]
+
+        def length(loc, open_mask, open_count):
+            result = memo.get((loc, open_mask))
+            if result is not None:
+                return result
+            searched[0] += 1
+            if stop is not None and not searched[0] & 1023 and stop():
+                raise _SolverAbort()
+            # no path can be longer than the number of open cells
+            result = 0
+            mask = masks[loc] & open_mask
+            while mask and result < open_count:
+                low = mask & -mask
+                mask ^= low
+                n = 1 + length(low.bit_length() - 1, open_mask ^ low, open_count - 1)
+                if n > result:
+                    result = n
+            memo[(loc, open_mask)] = result
+            return result
+
+        open_mask = self._reachable_mask(loc)
+        try:
+            remaining = length(loc, open_mask, bin(open_mask).count("1"))
+        except _SolverAbort:
+            return None
+        finally:
+            # length() refers to itself; break the cycle so that it does not
+            # keep `stop` (and whatever it refers to) alive until a collection
+            del length
+
+        # Walk the memoized lengths back from the start to recover the path
+        path = []
+        while remaining:
+            mask = masks[loc] & open_mask
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                if memo.get((low.bit_length() - 1, open_mask ^ low)) == remaining - 1:
+                    break
+            loc = low.bit_length() - 1
+            open_mask ^= low
+            path.append(self._coords[loc])
+            remaining -= 1
+        return path
+
+    def _reachable_mask(self, loc_idx):
+        """Return the mask of the open cells reachable by any sequence of
+        knight moves from the cell index `loc_idx`.
+        """
+        masks = Board._get_neighbor_masks(self.width, self.height)
+        blanks = self._blanks
+        reached = frontier = masks[loc_idx] & blanks
+        while frontier:
+            step = 0
+            while frontier:
+                low = frontier & -frontier
+                step |= masks[low.bit_length() - 1]
+                frontier ^= low
+            frontier = step & blanks & ~reached
+            reached |= frontier
+        return reached
+
+    def _generate_moves(self, loc_idx):
+        #print("in Board._generate_moves()")
+        """Generate the tuple of possible moves for an L-shaped motion (like a
+        knight in chess) from the cell index `loc_idx`.
+        """
+        if loc_idx == Board.NOT_MOVED_IDX:
+            return tuple(self._unpack(self._blanks))
+
+        cells = self._cells
+        return tuple([move for idx, move in self._neighbors[loc_idx]
+                      if cells[idx] == Board.BLANK])
+
+    def _unpack(self, mask):
+        """Return the (row, column) coordinates of the cells set in `mask`,
+        in increasing cell order.
+        """
+        coords = self._coords
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(coords[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def to_bytes(self):
+        #print("in Board.to_bytes()")
+        """Return a compact binary encoding of the current game state.
+
+        The encoding holds the board size, move count, initiative, both
+        player locations and a bitmap of the blocked cells (16 bytes for a
+        7x7 board); use from_bytes() to restore it. Boards of the same size
+        always encode to the same length.
+        """
+        size = self.width * self.height
+        return _HEADER.pack(self.width, self.height, self.move_count,
+                            int(self._active_player == self._player_2),
+                            self._p1_loc, self._p2_loc) + \
+            self._blocked_mask().to_bytes((size + 7) // 8, "little")
+
+    @classmethod
+    def from_bytes(cls, data, player_1, player_2, seed=None):
+        #print("in Board.from_bytes()")
+        """Return a new board between the given players holding the game state
+        encoded by to_bytes(). The new board has no moves to undo.
+        """
+        width, height, move_count, initiative, p1_loc, p2_loc = \
+            _HEADER.unpack_from(data)
+        size = width * height
+        blocked = int.from_bytes(
+            data[_HEADER.size:_HEADER.size + (size + 7) // 8], "little")
+        board = cls(player_1, player_2, width, height, seed)
+        board._set_state(blocked, p1_loc, p2_loc, initiative, move_count)
+        return board
+
+    def to_int(self):
+        #print("in Board.to_int()")
+        """Return the current game state packed into a single integer.
+
+        The blocked cells fill the low `width * height` bits, followed by
+        the location of player 1 and of player 2 (`width * height` when not
+        moved) and the initiative bit. The move count is not stored: in any
+        legally reached position it equals the number of blocked cells. On a
+        7x7 board the result fits in 62 bits, so it can be stored as a
+        64-bit integer key.
+        """
+        size = self.width * self.height
+        bits = size.bit_length()
+        p1_loc = size if self._p1_loc == Board.NOT_MOVED_IDX else self._p1_loc
+        p2_loc = size if self._p2_loc == Board.NOT_MOVED_IDX else self._p2_loc
+        initiative = int(self._active_player == self._player_2)
+        return (self._blocked_mask() | p1_loc << size |
+                p2_loc << (size + bits) | initiative << (size + 2 * bits))
+
+    @classmethod
+    def from_int(cls, value, player_1, player_2, width=7, height=7, seed=None):
+        #print("in Board.from_int()")
+        """Return a new board between the given players holding the game state
+        packed by to_int() for a board of the given size. The new board has
+        no moves to undo.
+        """
+        size = width * height
+        bits = size.bit_length()
+        blocked = value & ((1 << size) - 1)
+        p1_loc = value >> size & ((1 << bits) - 1)
+        p2_loc = value >> (size + bits) & ((1 << bits) - 1)
+        initiative = value >> (size + 2 * bits) & 1
+        board = cls(player_1, player_2, width, height, seed)
+        board._set_state(blocked,
+                         Board.NOT_MOVED_IDX if p1_loc == size else p1_loc,
+                         Board.NOT_MOVED_IDX if p2_loc == size else p2_loc,
+                         initiative, bin(blocked).count("1"))
+        return board
+
+    def _blocked_mask(self):
+        """Return an integer with bit `i` set for every blocked cell `i`."""
+        return ~self._blanks & ((1 << (self.width * self.height)) - 1)
+
+    def _set_state(self, blocked, p1_loc, p2_loc, initiative, move_count):
+        """Replace the state of this (new) board with the given blocked cell
+        mask, player cell indices, initiative and move count, and recompute
+        the hash.
+        """
+        self._cells = bytearray((blocked >> idx) & 1
+                                for idx in range(self.width * self.height))
+        self._blanks = ~blocked & ((1 << (self.width * self.height)) - 1)
+        self._reset_state(p1_loc, p2_loc, initiative, move_count)
+
+    def _reset_state(self, p1_loc, p2_loc, initiative, move_count):
+        """Set the player locations, initiative and move count of this board
+        once its cells have been replaced, and recompute its hash from
+        scratch.
+        """
+        self._p1_loc = p1_loc
+        self._p2_loc = p2_loc
+        self.move_count = move_count
+        if initiative:
+            self._active_player = self._player_2
+            self._inactive_player = self._player_1
+        else:
+            self._active_player = self._player_1
+            self._inactive_player = self._player_2
+        self._undo_stack = []
+        self._p1_moves = self._p2_moves = None
+
+        blocked_keys, p1_keys, p2_keys, initiative_key = self._zobrist
+        blocked = self._blocked_mask()
+        self._hash = initiative_key if initiative else 0
+        for idx in range(self.width * self.height):
+            if blocked >> idx & 1:
+                self._hash ^= blocked_keys[idx]
+        if p1_loc != Board.NOT_MOVED_IDX:
+            self._hash ^= p1_keys[p1_loc]
+        if p2_loc != Board.NOT_MOVED_IDX:
+            self._hash ^= p2_keys[p2_loc]
 
     def print_board(self):
         #print("in Board.print_board()")
@@ -289,8 +957,8 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-        p1_loc = self._board_state[-1]
-        p2_loc = self._board_state[-2]
+        p1_loc = self._p1_loc
+        p2_loc = self._p2_loc
 
         col_margin = len(str(self.height - 1)) + 1
         prefix = "{:<" + "{}".format(col_margin) + "}"
@@ -300,7 +968,7 @@ class Board(object):
             out += prefix.format(i) + ' | '
             for j in range(self.width):
                 idx = i + j * self.height
-                if not self._board_state[idx]:
+                if self._blanks >> idx & 1:
                     out += ' '
                 elif p1_loc == idx:
                     out += symbols[0]
@@ -313,7 +981,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, ponder=False):
         #print("in Board.play()")
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -324,6 +992,14 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        ponder : bool (optional)
+            If True, before every turn (and before its clock starts) call
+            `ponder(game, time_limit)` on the waiting player, if it has such
+            a method, with a copy of the current game. The player may think
+            about the position in the background (in another process, so
+            as not to slow down its opponent) for at most `time_limit`
+            milliseconds, and must return immediately.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -337,9 +1013,12 @@ class Board(object):
 
         while True:
 
-            legal_player_moves = self.get_legal_moves()
+            legal_player_moves = self.get_legal_moves(shuffle=False)
             game_copy = self.copy()
 
+            if ponder and hasattr(self._inactive_player, "ponder"):
+                self._inactive_player.ponder(self.copy(), time_limit)
+
             move_start = time_millis()
             time_left = lambda : time_limit - (time_millis() - move_start)
             curr_move = self._active_player.get_move(game_copy, time_left)
@@ -360,3 +1039,22 @@ class Board(object):
 
             self.apply_move(curr_move)
             self.to_string()
+
+
+def encode_boards(boards):
+    """Return the game states of a sequence of boards of the same size as a
+    single bytes object of concatenated Board.to_bytes() records.
+    """
+    return b"".join(board.to_bytes() for board in boards)
+
+
+def decode_boards(data, player_1, player_2, board_class=Board):
+    """Return the list of boards (instances of `board_class` between the given
+    players) encoded by encode_boards().
+    """
+    if not data:
+        return []
+    width, height = data[0], data[1]
+    record = _HEADER.size + (width * height + 7) // 8
+    return [board_class.from_bytes(data[i:i + record], player_1, player_2)
+            for i in range(0, len(data), record)]
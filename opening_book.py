@@ -0,0 +1,189 @@
+"""Build and read opening books: files holding the move to play in every
+early game position, so that agents can play the opening instantly instead
+of searching the widest part of the game tree.
+
+A book is built offline by searching every position reachable within a given
+number of plies (one per set of symmetric positions) to a fixed depth, in
+parallel worker processes:
+
+    python opening_book.py book.bin --plies 3 --depth 5
+
+and used by passing an `OpeningBook` to a player:
+
+    player = AlphaBetaPlayer(book=OpeningBook("book.bin"))
+
+The file is an open addressing hash table of fixed size records keyed by
+`Board.canonical_hash()`, so a lookup reads one or two records. The file is
+memory mapped read-only, which lets any number of agent processes share a
+single copy of it in memory.
+"""
+import argparse
+import mmap
+import multiprocessing
+import struct
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer, custom_score
+
+# File header: magic, board width, board height, number of slots (a power
+# of two) and number of positions; followed by the slots, each holding a
+# canonical position key and the cell index of the move to play in the
+# canonical orientation (EMPTY for an unused slot)
+_HEADER = struct.Struct("<8sBBII")
+_RECORD = struct.Struct("<QB")
+MAGIC = b"ISOBOOK1"
+EMPTY = 0xff
+
+
+class OpeningBook:
+    """Read-only view of an opening book file.
+
+    Parameters
+    ----------
+    path : str
+        The path of a book written by `build_book()`.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as book_file:
+            self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self._slots, self._size = \
+            _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError("{} is not an opening book file.".format(path))
+
+    def __len__(self):
+        return self._size
+
+    def lookup(self, game):
+        """Return the book move for the active player of `game`, or None if
+        the position is not in the book.
+        """
+        if (game.width, game.height) != (self.width, self.height):
+            return None
+        key, symmetry = game.canonical_hash()
+        mask = self._slots - 1
+        slot = key & mask
+        while True:
+            slot_key, idx = _RECORD.unpack_from(
+                self._map, _HEADER.size + slot * _RECORD.size)
+            if idx == EMPTY:
+                return None
+            if slot_key == key:
+                move = (idx % self.height, idx // self.height)
+                return game.map_move(move, symmetry, inverse=True)
+            slot = (slot + 1) & mask
+
+    def close(self):
+        """Unmap the book file."""
+        self._map.close()
+
+
+def write_book(path, entries, width=7, height=7):
+    """Write an opening book file holding the `(canonical key, move)` pairs in
+    `entries`, where each move is given in the canonical orientation.
+    """
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    table = [None] * slots
+    for key, move in entries:
+        slot = key & (slots - 1)
+        while table[slot] is not None and table[slot][0] != key:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = (key, move[0] + move[1] * height)
+    with open(path, "wb") as book_file:
+        book_file.write(_HEADER.pack(MAGIC, width, height, slots, len(entries)))
+        for record in table:
+            book_file.write(_RECORD.pack(*record) if record else
+                            _RECORD.pack(0, EMPTY))
+
+
+def opening_positions(plies, width=7, height=7):
+    """Return a board for every position reachable within `plies` moves from
+    the start of the game where the player to move has a legal move, keeping
+    one position out of every set of symmetric positions.
+    """
+    positions = {}
+    frontier = [Board("Player1", "Player2", width, height)]
+    for ply in range(plies + 1):
+        successors = []
+        for game in frontier:
+            key = game.canonical_hash()[0]
+            moves = game.get_legal_moves(shuffle=False)
+            if key in positions or not moves:
+                continue
+            positions[key] = game
+            if ply < plies:
+                successors.extend(game.forecast_move(move) for move in moves)
+        frontier = successors
+    return list(positions.values())
+
+
+# The player of a book builder process
+_builder_player = None
+
+def _init_builder(score_fn, depth):
+    """Create the player of a book builder process."""
+    global _builder_player
+    _builder_player = AlphaBetaPlayer(search_depth=depth, score_fn=score_fn,
+                                      in_place=True)
+    _builder_player.time_left = lambda: float("inf")
+
+def _search_position(data):
+    """Search the position `data` (serialized with `Board.to_bytes()`) to the
+    depth of the builder player, and return its canonical key and the best
+    move in the canonical orientation.
+    """
+    player = _builder_player
+    game = Board.from_bytes(data, player, "Opponent")
+    if game.active_player is not player:
+        game = Board.from_bytes(data, "Opponent", player)
+    player.tt.new_search()
+    player.ordering.new_search()
+    for depth in range(1, player.search_depth + 1):
+        move = player.alphabeta(game, depth)
+    key, symmetry = game.canonical_hash()
+    return key, game.map_move(move, symmetry)
+
+
+def build_book(path, plies=2, depth=5, score_fn=custom_score, width=7,
+               height=7, processes=None):
+    """Search every opening position within `plies` moves of the start of the
+    game to `depth` with an AlphaBetaPlayer using `score_fn`, in `processes`
+    worker processes (one per CPU by default), and write the results to an
+    opening book file at `path`.
+
+    Returns
+    -------
+    int
+        The number of positions in the book.
+    """
+    positions = opening_positions(plies, width, height)
+    with multiprocessing.Pool(processes, _init_builder, (score_fn, depth)) as pool:
+        entries = list(pool.imap_unordered(
+            _search_position, [game.to_bytes() for game in positions],
+            chunksize=4))
+    write_book(path, entries, width, height)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an Isolation opening book.")
+    parser.add_argument("path", help="the book file to write")
+    parser.add_argument("--plies", type=int, default=2,
+                        help="number of opening moves covered by the book")
+    parser.add_argument("--depth", type=int, default=5,
+                        help="search depth for every book position")
+    parser.add_argument("--size", type=int, nargs=2, default=(7, 7),
+                        metavar=("WIDTH", "HEIGHT"), help="board size")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    count = build_book(args.path, args.plies, args.depth, width=args.size[0],
+                       height=args.size[1], processes=args.processes)
+    print("Wrote {} positions to {}".format(count, args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -59,13 +59,11 @@ def open_move_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    own_moves, _, utility = game.mobility(player)
+    if utility:
+        return utility
 
-    return float(len(game.get_legal_moves(player)))
+    return float(own_moves)
 
 
 def improved_score(game, player):
@@ -89,14 +87,10 @@ def improved_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    own_moves, opp_moves, utility = game.mobility(player)
+    if utility:
+        return utility
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
     return float(own_moves - opp_moves)
 
 
@@ -156,7 +150,7 @@ class RandomPlayer():
             A randomly selected legal move; may return (-1, -1) if there are
             no available legal moves.
         """
-        legal_moves = game.get_legal_moves()
+        legal_moves = game.get_legal_moves(shuffle=False)
         if not legal_moves:
             return (-1, -1)
         return legal_moves[randint(0, len(legal_moves) - 1)]
@@ -192,7 +186,7 @@ class GreedyPlayer():
             for the current game state; may return (-1, -1) if there are no
             legal moves.
         """
-        legal_moves = game.get_legal_moves()
+        legal_moves = game.get_legal_moves(shuffle=False)
         if not legal_moves:
             return (-1, -1)
         _, move = max([(self.score(game.forecast_move(m), self), m) for m in legal_moves])
@@ -230,7 +224,7 @@ class HumanPlayer():
             terminal prompt; automatically return (-1, -1) if there are no
             legal moves
         """
-        legal_moves = game.get_legal_moves()
+        legal_moves = game.get_legal_moves(shuffle=False)
         if not legal_moves:
             return (-1, -1)
 
@@ -0,0 +1,1116 @@
+"""Reusable building blocks for the game tree searches of the agents in
+`game_agent.py` and `competition_agent.py`.
+"""
+import json
+import math
+
+
+class TranspositionTable:
+    """Bounded cache of alpha-beta search results, keyed by position hash.
+
+    Every entry records the remaining search depth, the type of bound the
+    score represents (exact, lower or upper) and the best move found, so a
+    transposed position -- or the same position in the next iteration of
+    iterative deepening -- can either be cut off straight away or searched
+    best move first.
+
+    The table is a fixed array of `size` slots indexed by `key % size`, so
+    its memory use is bounded (roughly 150 bytes per occupied slot). On a
+    collision the deeper of the two entries is kept, except that entries
+    left over from an earlier search (see `new_search()`) are always
+    replaced; this keeps the table useful across the `get_move()` calls of a
+    game without it filling up with stale, deep results.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The maximum number of entries held by the table.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    # Salt mixed into the keys of positions where the searching player is
+    # to move. Together with the side-to-move bit in `Board.hash()` it tells
+    # apart which of the two players the stored scores belong to, so the
+    # same table stays valid when its player changes seats between games.
+    MAX_NODE = 0x5bd1e9955bd1e995
+
+    def __init__(self, size=1 << 15):
+        self.size = size
+        self.generation = 0
+        self._slots = [None] * size
+        # number of probes, and of probes that found an entry, counted by
+        # counted_probe() (see SearchStats)
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Mark the entries stored so far as belonging to an earlier search
+        so that they are the first to be replaced.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """Remove all entries from the table."""
+        self._slots = [None] * self.size
+
+    def probe(self, key, depth, alpha, beta):
+        """Look up the entry stored for `key`.
+
+        Parameters
+        ----------
+        key : int
+            The position key.
+
+        depth : int
+            The remaining depth of the search at the position.
+
+        alpha, beta : float
+            The search window at the position.
+
+        Returns
+        -------
+        (float or None, float, float, (int, int) or None)
+            The stored score if it settles the position for this depth and
+            window (None otherwise), the window narrowed by the stored bound,
+            and the stored best move (None if there is no entry).
+        """
+        entry = self._slots[key % self.size]
+        if entry is None or entry[0] != key:
+            return None, alpha, beta, None
+        _, entry_depth, flag, score, move, _ = entry
+        if entry_depth >= depth:
+            if flag == TranspositionTable.EXACT:
+                return score, alpha, beta, move
+            if flag == TranspositionTable.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score, alpha, beta, move
+        return None, alpha, beta, move
+
+    def counted_probe(self, key, depth, alpha, beta):
+        """Same as `probe()`, but count the probe in `probes`, and in `hits`
+        if it finds an entry.
+        """
+        self.probes += 1
+        entry = self._slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+        return self.probe(key, depth, alpha, beta)
+
+    def store(self, key, depth, score, alpha, beta, move):
+        """Record the result of searching the position `key` to `depth`
+        with the window (`alpha`, `beta`); the bound type is derived from
+        where `score` falls relative to the window.
+        """
+        if score <= alpha:
+            flag = TranspositionTable.UPPER
+        elif score >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        idx = key % self.size
+        entry = self._slots[idx]
+        if entry is None or depth >= entry[1] or entry[5] != self.generation:
+            self._slots[idx] = (key, depth, flag, score, move, self.generation)
+
+    def __len__(self):
+        return sum(1 for entry in self._slots if entry is not None)
+
+
+class EvaluationCache:
+    """Memoizing wrapper for a score function, to pass as the `score_fn` of a
+    player: positions that are evaluated again (in a later search of the
+    game, in a re-search, or reached by transposition) are looked up instead
+    of scored again.
+
+        player = AlphaBetaPlayer(score_fn=EvaluationCache(custom_score_3))
+
+    Values are keyed by `Board.hash()` and by whether the player they are
+    computed for is the one to move, which (as the hash covers the side to
+    move) tells which of the two players that is; the score function must
+    therefore not depend on anything else. Like the `TranspositionTable`,
+    the cache is a fixed array of `size` slots indexed by `key % size`, and
+    a new value replaces the one in its slot. `hits` and `misses` count the
+    lookups that found a value and those that did not.
+
+    A lookup costs about as much as evaluating a plain difference of move
+    counts (`improved_score`), so the cache pays off for more expensive
+    score functions.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to memoize, called as `score_fn(game, player)`.
+
+    size : int (optional)
+        The maximum number of values held by the cache.
+    """
+    def __init__(self, score_fn, size=1 << 16):
+        self.score_fn = score_fn
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._keys = [None] * size
+        self._values = [None] * size
+
+    def __call__(self, game, player):
+        key = game.hash() << 1 | (player == game.active_player)
+        idx = key % self.size
+        if self._keys[idx] == key:
+            self.hits += 1
+            return self._values[idx]
+        self.misses += 1
+        value = self._values[idx] = self.score_fn(game, player)
+        self._keys[idx] = key
+        return value
+
+    def clear(self):
+        """Remove all values from the cache."""
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+
+    def __len__(self):
+        return sum(1 for key in self._keys if key is not None)
+
+
+class MoveOrdering:
+    """Move ordering heuristics shared by the iterations of an iterative
+    deepening search.
+
+    Moves are tried in this order: the move suggested by the caller (e.g. a
+    transposition table move), the move of the previous iteration's principal
+    variation at the same ply, the two killer moves of the ply (the latest
+    moves that caused a beta cutoff there), and then all other moves by their
+    history score -- the sum of `depth ** 2` over all cutoffs caused by a move
+    to the same destination cell. Ties keep the order of the input list.
+
+    The searching player reports back through `cutoff()` and collects the
+    principal variation with `clear_line()` / `update_line()` at every
+    interior node; `finish_iteration()` makes it the line followed by the
+    next iteration.
+    """
+    FIRST = 1 << 62
+    PV = 1 << 61
+    KILLER_1 = 1 << 60
+    KILLER_2 = 1 << 59
+
+    def __init__(self):
+        self.history = {}
+        self.pv = ()
+        self._killers = []
+        self._lines = [(), ()]
+
+    def new_search(self):
+        """Prepare for the search of a new position: forget the killer moves
+        and the principal variation and halve the history scores, so that
+        the statistics of recent searches dominate.
+        """
+        history = self.history
+        for move in history:
+            history[move] >>= 1
+        self.pv = ()
+        self._killers = []
+
+    def order(self, moves, ply, first=None):
+        """Return a list of `moves` sorted best first for a node at distance
+        `ply` from the root, trying `first` before all other moves.
+        """
+        pv_move = self.pv[ply] if ply < len(self.pv) else None
+        killer_1, killer_2 = (self._killers[ply] if ply < len(self._killers)
+                              else (None, None))
+        history = self.history
+
+        def priority(move):
+            if move == first:
+                return MoveOrdering.FIRST
+            if move == pv_move:
+                return MoveOrdering.PV
+            if move == killer_1:
+                return MoveOrdering.KILLER_1
+            if move == killer_2:
+                return MoveOrdering.KILLER_2
+            return history.get(move, 0)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def cutoff(self, move, ply, depth):
+        """Record that `move` caused a beta cutoff at `ply` with `depth`
+        plies left to search.
+        """
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        killers = self._killers
+        while len(killers) <= ply:
+            killers.append([None, None])
+        if killers[ply][0] != move:
+            killers[ply][1] = killers[ply][0]
+            killers[ply][0] = move
+
+    def clear_line(self, ply):
+        """Start collecting the principal variation of an interior node at
+        `ply` (leaf nodes need not call this).
+        """
+        lines = self._lines
+        while len(lines) <= ply + 1:
+            lines.append(())
+        lines[ply] = lines[ply + 1] = ()
+
+    def update_line(self, ply, move):
+        """Make `move` followed by the line of its child the principal
+        variation of the node at `ply`.
+        """
+        self._lines[ply] = (move,) + self._lines[ply + 1]
+
+    def finish_iteration(self):
+        """Adopt the principal variation found by a completed iteration."""
+        self.pv = self._lines[0]
+
+
+def solve_endgame(game, stop=None, memo=None):
+    """Solve `game` exactly if its players have been partitioned into
+    separate regions of the board (see `Board.is_partitioned()`).
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The position to solve.
+
+    stop : callable (optional)
+        Passed on to `Board.longest_path()` to abandon the search.
+
+    memo : dict (optional)
+        Passed on to `Board.longest_path()` to keep its results for later
+        positions of the game.
+
+    Returns
+    -------
+    (float, (int, int) or None) or None
+        The value of the position for the active player (inf for a proven
+        win, -inf for a proven loss) and the first move of its longest path
+        (None if it cannot move); None if the players are not partitioned or
+        the search was stopped.
+    """
+    if not game.is_partitioned():
+        return None
+    own_path = game.longest_path(game.active_player, stop, memo)
+    if own_path is None:
+        return None
+    opp_path = game.longest_path(game.inactive_player, stop, memo)
+    if opp_path is None:
+        return None
+    # The active player runs out of moves first unless its path is longer
+    value = float("inf") if len(own_path) > len(opp_path) else float("-inf")
+    return value, own_path[0] if own_path else None
+
+
+def growth_rate(costs):
+    """Return the growth per iteration of the last of the iteration `costs`
+    of an iterative deepening search: the geometric mean of the last two
+    ratios between consecutive costs, because the cost of alpha-beta
+    iterations alternates between odd and even depths. Returns None if
+    there are fewer than two costs.
+    """
+    costs = costs[-3:]
+    if len(costs) < 2 or costs[0] <= 0:
+        return None
+    ratio = costs[-1] / costs[0]
+    return ratio ** .5 if len(costs) == 3 else ratio
+
+
+class TimeManager:
+    """Plans the iterations of an iterative deepening search within the time
+    left for a move, instead of deepening until the time runs out and
+    throwing away the unfinished last iteration.
+
+    The cost of every iteration, and of the first root move searched in it
+    (the move of the principal variation), is measured on the player's
+    `time_left()` clock. Their growth from one iteration to the next is the
+    effective branching factor (EBF), from which the cost of the next
+    iteration is predicted. Since an interrupted iteration still yields a
+    move once its first root move has been searched (see
+    `partial_result()`), the next iteration is started:
+
+    * never, once the root score is a proven win or loss (an infinite score),
+      which deeper searches cannot change;
+    * always, while the best move has just changed (an unsettled position,
+      where any deeper look may pay off);
+    * otherwise, unless its first root move is predicted to take more than
+      `MARGIN` times the time left. The time left for a move cannot be saved
+      for later moves, so an iteration is only skipped when it is all but
+      certain to produce nothing; the predictions are off by a factor of
+      three in either direction for about one iteration in ten.
+
+    Iterations cheaper than `MIN_COST` milliseconds are too noisy to predict
+    from and are always followed by the next one.
+
+    The manager also learns how late the player stops: whenever a search is
+    aborted, the time by which it overshot the player's timer threshold
+    (the unwinding of the search, but also garbage collection or the process
+    being descheduled) is added to a reserve, which is taken off the clock
+    of the following moves (see `clock()`) and decays by `RESERVE_DECAY`
+    per move.
+
+    The searching player reports to the manager with `start_iteration()`,
+    `searched()` after every root move, `finish_iteration()` and `aborted()`.
+    """
+    MIN_COST = 1.
+    MAX_EBF = 32.
+    MARGIN = 3.
+    RESERVE_DECAY = .75
+
+    def __init__(self):
+        # (depth, score, move, cost, first move cost) of every iteration
+        self.iterations = []
+        self._start = None
+        self._first_cost = None
+        self._sound = False
+        self._partial = None
+        self.reserve = 0.
+
+    def new_search(self):
+        """Forget the iterations of the previous search."""
+        self.iterations = []
+        self._start = None
+
+    def clock(self, time_left):
+        """Return the `time_left` function of a new move, less the reserve
+        learned from the previous moves.
+        """
+        self.reserve *= TimeManager.RESERVE_DECAY
+        reserve = self.reserve
+        if reserve < .01:
+            return time_left
+        return lambda: time_left() - reserve
+
+    def aborted(self, time_left, threshold):
+        """Record that a search on a `clock()` that was to stop at
+        `threshold` milliseconds had stopped with `time_left`.
+        """
+        self.reserve += max(0., threshold - time_left)
+
+    def ebf(self):
+        """Return the effective branching factor, the `growth_rate()` of the
+        cost of the iterations, or None if there are too few of them.
+        """
+        ebf = growth_rate([iteration[3] for iteration in self.iterations])
+        if ebf is None:
+            return None
+        return min(max(ebf, 1.), TimeManager.MAX_EBF)
+
+    def next_iteration(self, time_left):
+        """Return True if the next iteration is worth starting with
+        `time_left` milliseconds left to search.
+        """
+        if time_left <= 0:
+            return False
+        if not self.iterations:
+            return True
+        _, score, move, cost, first_cost = self.iterations[-1]
+        if abs(score) == float("inf"):
+            return False
+        ebf = self.ebf()
+        if ebf is None or cost < TimeManager.MIN_COST:
+            return True
+        if len(self.iterations) > 1 and move != self.iterations[-2][2]:
+            return True
+        return first_cost * ebf < time_left * TimeManager.MARGIN
+
+    def start_iteration(self, time_left):
+        """Start timing an iteration with `time_left` milliseconds left."""
+        self._start = time_left
+        self._first_cost = None
+        self._partial = None
+
+    def searched(self, time_left, move, best_score, best_move, alpha):
+        """Record that the root move `move` has been searched, leaving
+        `best_move` with `best_score` the best move of the iteration so far,
+        in a root search with the window's lower bound `alpha`.
+
+        The best move so far is only a usable result of an interrupted
+        iteration if the first move searched was the previous iteration's
+        best move, and if its score is not merely an upper bound (a fail low
+        of an aspiration window).
+        """
+        if self._start is None:
+            return
+        if self._first_cost is None:
+            self._first_cost = self._start - time_left
+            self._sound = not self.iterations or move == self.iterations[-1][2]
+        if self._sound and (best_score > alpha or alpha == float("-inf")):
+            self._partial = (best_score, best_move)
+
+    def finish_iteration(self, time_left, depth, score, move):
+        """Record the completed iteration of `depth` and its result."""
+        if self._start is None:
+            return
+        cost = self._start - time_left
+        first_cost = self._first_cost if self._first_cost is not None else cost
+        self.iterations.append((depth, score, move, cost, first_cost))
+        self._start = None
+
+    def partial_result(self, depth):
+        """Return `(depth, score, move)` for the interrupted iteration of
+        `depth` if it has a usable result (see `searched()`), or None.
+        """
+        partial = self._partial if self._start is not None else None
+        self._start = self._partial = None
+        if partial is None:
+            return None
+        return (depth,) + partial
+
+
+class Deadline:
+    """Checks a search's deadline every few nodes rather than at every node.
+
+    Reading the clock (a `time_left()` call) costs about as much as a small
+    search node, so `expired()` only counts the node down, and polls the
+    clock once the count runs out. The number of nodes between two polls is
+    calibrated to the node rate measured between the polls so far: it covers
+    at most `POLL_MS` milliseconds, and at most half of the time left before
+    the deadline, so that the polls get denser as the deadline approaches
+    and the search stops within a small fraction of a millisecond of it. The
+    count at most doubles from one poll to the next, so that a single noisy
+    measurement cannot throw it off.
+
+    Parameters
+    ----------
+    time_left : callable or None
+        Returns the number of milliseconds left; replaced by `restart()`.
+        Players pass their current `time_left()` to `restart()` at the start
+        of every search rather than a function that calls it, which would
+        tie the player and its timer in a reference cycle.
+
+    threshold : float
+        The deadline: the search is out of time when fewer than `threshold`
+        milliseconds are left (a player's `TIMER_THRESHOLD`).
+    """
+    POLL_MS = 1.
+
+    def __init__(self, time_left, threshold):
+        self.time_left = time_left
+        self.threshold = threshold
+        # measured number of nodes per millisecond
+        self.rate = 0.
+        self._nodes = 0
+        self._interval = 1
+        self._countdown = 1
+        self._last = None
+
+    @property
+    def nodes(self):
+        """The number of nodes counted by `expired()` so far."""
+        return self._nodes + self._interval - self._countdown
+
+    def restart(self, time_left=None):
+        """Poll the clock at the next node, e.g. because the clock has been
+        replaced for a new search (by `time_left`, if given). The measured
+        node rate is kept.
+        """
+        if time_left is not None:
+            self.time_left = time_left
+        self._nodes = self.nodes
+        self._interval = self._countdown = 1
+        self._last = None
+
+    def expired(self):
+        """Count a node and return True if the deadline has passed."""
+        self._countdown -= 1
+        return self._countdown <= 0 and self._poll()
+
+    def _poll(self):
+        left = self.time_left()
+        interval = self._interval
+        self._nodes += interval
+        if self._last is not None and self._last > left:
+            self.rate = interval / (self._last - left)
+        self._last = left
+        slack = left - self.threshold
+        if slack <= 0:
+            self._interval = self._countdown = 1
+            return True
+        self._interval = self._countdown = max(1, min(
+            2 * interval, int(self.rate * min(Deadline.POLL_MS, slack / 2))))
+        return False
+
+
+class NegamaxSearch:
+    """The depth-limited game tree search shared by the agents: a single
+    negamax recursion, configured by the attributes of the searching player.
+
+    Every position is searched in place: a move is applied to the board with
+    `apply_move()` and taken back with `undo_move()`, so the search creates
+    no board per node. A search that runs out of time (see `Deadline`) sets
+    `aborted` and returns at once from every level of the recursion, with
+    meaningless values that the callers discard, instead of raising an
+    exception through it.
+
+    Subclasses must provide `score` (the evaluation function, called as
+    `score(game, self)`), `time_left` (the clock of the current move),
+    `TIMER_THRESHOLD` and `timer` (a `Deadline` on them), and may set:
+
+    pruning : bool
+        Cut off the search with alpha-beta bounds; without it every node is
+        searched with the full minimax tree below it.
+
+    tt : `TranspositionTable` or None
+        Cache of search results.
+
+    ordering : `MoveOrdering` or None
+        Move ordering heuristics (collects the principal variation).
+
+    pvs : bool
+        Search all but the first child of a node with a null window (Principal
+        Variation Search), re-searching it only when that fails.
+
+    canonical_plies : int
+        Key the transposition table entries of positions within this many
+        moves of the start of the game by `Board.canonical_hash()`.
+
+    in_place : bool
+        Search the board passed to `search_root()` itself (it is restored
+        when the search returns, also when it is aborted) instead of a copy.
+
+    stats : `SearchStats` or None
+        Statistics collector; the transposition table probes and hits and
+        the beta cutoffs are only counted for it if it is set, as checked
+        once at the start of every `search_root()`.
+
+    The same attributes configure the move choice of `choose_move()`, which
+    plays book moves, single legal moves and solved endgames without a
+    search and otherwise runs `iterative_deepening()`:
+
+    book : `opening_book.OpeningBook` or None
+        Opening book to play moves from.
+
+    endgame : bool
+        Solve partitioned positions with `solve_endgame()`.
+
+    time_manager : `TimeManager` or None
+        Plans the iterations; without it the search deepens until the time
+        runs out.
+
+    aspiration : float or None
+        Margin of the aspiration window around the previous iteration's
+        score (see `aspiration_search()`).
+
+    root_moves : list<(int, int)> or None
+        The root moves to search (all legal moves if None).
+
+    Until both players are placed, moves into symmetric positions are searched
+    only once (see `Board.get_legal_moves()`).
+    """
+    pruning = True
+    tt = None
+    ordering = None
+    pvs = False
+    canonical_plies = 0
+    in_place = False
+    stats = None
+    book = None
+    endgame = False
+    time_manager = None
+    aspiration = None
+    root_moves = None
+    aborted = False
+    # depth of the current iteration, to tell the ply of a node, and score
+    # of the root found by the last iteration or endgame solution
+    _depth = 0
+    _score = None
+    # memo of the endgame solver (see `Board.longest_path()`), kept for the
+    # moves of one game, and the move count of the last position solved
+    _path_memo = None
+    _path_memo_moves = 0
+    # number of beta cutoffs, and of those caused by the first move searched
+    # (counted only with stats), and the probe method of the table for the
+    # current search
+    cutoffs = 0
+    first_cutoffs = 0
+    _counting = False
+    _probe = None
+
+    def choose_move(self, game, best_move):
+        """Return the move to play in `game` (`best_move` if the search
+        finds none) and how it was chosen (see `SearchStats`).
+        """
+        if self.time_manager is not None:
+            self.time_left = self.time_manager.clock(self.time_left)
+        move = self.immediate_move(game)
+        if move is not None:
+            return move, "immediate"
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.ordering is not None:
+            self.ordering.new_search()
+        return self.search_move(game, best_move)
+
+    def immediate_move(self, game):
+        """Return the move to play in `game` without an alpha-beta search --
+        a book move, the only legal move or the move of a solved endgame --
+        or None.
+        """
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move in game.get_legal_moves(shuffle=False):
+                return move
+        if game.count_legal_moves() == 1:
+            return game.get_legal_moves(shuffle=False)[0]
+        if self.endgame:
+            return self.endgame_move(game)
+        return None
+
+    def endgame_move(self, game):
+        """Return the move that plays out the exact solution of `game` if
+        its players are partitioned, or None.
+
+        The solver may use up to half of the time left, the rest is kept
+        for a regular search if it has to give up. Its memo is kept for the
+        later moves of the same game.
+        """
+        if self._path_memo is None or game.move_count < self._path_memo_moves:
+            self._path_memo = {}
+        self._path_memo_moves = game.move_count
+        reserve = max(self.time_left() / 2, self.TIMER_THRESHOLD)
+        solved = solve_endgame(game, lambda: self.time_left() < reserve,
+                               self._path_memo)
+        if solved is None:
+            return None
+        self._score, move = solved
+        return move
+
+    def search_move(self, game, best_move):
+        """Return the best move for `game` found by `iterative_deepening()`
+        (`best_move` if it finds none) and "search".
+        """
+        iterations = self.iterative_deepening(game)
+        return (iterations[-1][2] if iterations else best_move), "search"
+
+    def iterative_deepening(self, game, partial=True):
+        """Search `game` one depth at a time until the time runs out or the
+        time manager stops the search, reporting every iteration to the
+        time manager and the statistics collector.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The position to search, with the searching player to move.
+
+        partial : bool (optional)
+            Also return the result of an interrupted iteration.
+
+        Returns
+        -------
+        list<(int, float, (int, int))>
+            The depth, root score and best move of every completed iteration,
+            followed by those of an interrupted iteration if `partial` is set
+            and it has a usable result (see `TimeManager.partial_result()`).
+        """
+        iterations = []
+        manager = self.time_manager
+        stats = self.stats
+        if manager is not None:
+            manager.new_search()
+        depth = 1
+        while self.time_left() >= self.TIMER_THRESHOLD:
+            if manager is not None:
+                if not manager.next_iteration(self.time_left() - self.TIMER_THRESHOLD):
+                    return iterations
+                manager.start_iteration(self.time_left())
+            if (self.aspiration is None or not iterations or
+                    abs(iterations[-1][1]) == float("inf")):
+                result = self.search_iteration(game, depth)
+            else:
+                result = self.aspiration_search(game, depth, iterations[-1][1])
+            if result is None:
+                if stats is not None:
+                    stats.aborted()
+                break
+            score, move = result
+            iterations.append((depth, score, move))
+            if manager is not None:
+                manager.finish_iteration(self.time_left(), depth, score, move)
+            if stats is not None:
+                stats.finish_iteration(self, depth)
+            depth += 1
+        if manager is not None:
+            manager.aborted(self.time_left(), self.TIMER_THRESHOLD)
+            result = manager.partial_result(depth)
+            if partial and result is not None:
+                iterations.append(result)
+        return iterations
+
+    def aspiration_search(self, game, depth, score):
+        """Search the root to `depth` with an aspiration window around the
+        `score` of the previous iteration, re-searching with the failing side
+        of the window opened up until the score falls inside it.
+
+        Returns the result of the final `search_iteration()`, or None if the
+        time runs out.
+        """
+        alpha = score - self.aspiration
+        beta = score + self.aspiration
+        while True:
+            result = self.search_iteration(game, depth, alpha, beta)
+            if result is None:
+                return None
+            if result[0] <= alpha and alpha != float("-inf"):
+                alpha = float("-inf")
+            elif result[0] >= beta and beta != float("inf"):
+                beta = float("inf")
+            else:
+                return result
+
+    def search_iteration(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+        """Search the `root_moves` of `game` to `depth` with `search_root()`,
+        reporting every root move to the time manager, and record the root
+        score in `_score`.
+
+        Returns
+        -------
+        (float, (int, int) or None) or None
+            The score and best move, or None if the time has run out.
+        """
+        self._depth = depth
+        if self.time_left() < self.TIMER_THRESHOLD:
+            return None
+
+        # Only the root moves are shuffled, so that equally scored moves are
+        # chosen at random; the inner nodes use the cheaper fixed order.
+        moves = game.get_legal_moves(distinct=game.move_count < 2)
+        if self.root_moves is not None:
+            moves = [m for m in moves if m in self.root_moves]
+        searched = None
+        manager = self.time_manager
+        if manager is not None:
+            searched = lambda *args: manager.searched(self.time_left(), *args)
+        result = self.search_root(game, depth, moves, alpha, beta, searched)
+        if result is not None:
+            self._score = result[0]
+        return result
+
+    def search_root(self, game, depth, moves, alpha=float("-inf"),
+                    beta=float("inf"), searched=None):
+        """Search the root `moves` of `game`, where the searching player is to
+        move, to `depth`.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The root position.
+
+        depth : int
+            The number of plies to search.
+
+        moves : list<(int, int)>
+            The root moves to search, in the order to search them unless the
+            transposition table or the move ordering suggest better ones.
+
+        alpha, beta : float (optional)
+            The search window.
+
+        searched : callable (optional)
+            Called as `searched(move, best_score, best_move, alpha)` after
+            every root move (see `TimeManager.searched()`).
+
+        Returns
+        -------
+        (float, (int, int) or None) or None
+            The score of the root for the searching player and the best move
+            (the first move if all moves lose, None if there are none), or
+            None if the search was aborted.
+        """
+        self.start_search()
+        if not self.in_place:
+            game = game.copy()
+        tt = self.tt
+        tt_move = None
+        if tt is not None:
+            # The root is always searched in full, but the best move of the
+            # previous iteration goes first to narrow the window early
+            key, symmetry = self.tt_key(game, TranspositionTable.MAX_NODE)
+            tt_move = self._probe(key, depth, alpha, beta)[3]
+            if tt_move is not None and symmetry:
+                tt_move = game.map_move(tt_move, symmetry, inverse=True)
+        if self.ordering is not None:
+            self.ordering.clear_line(0)
+        moves = self.order_moves(moves, 0, tt_move)
+        best_score = float("-inf")
+        best_move = moves[0] if moves else None
+        alpha_0 = alpha
+        for move in moves:
+            value = self._child_value(game, move, depth, alpha, beta, 1, 1,
+                                      move is not moves[0])
+            if self.aborted:
+                return None
+            if value > best_score:
+                best_score = value
+                best_move = move
+                if self.ordering is not None:
+                    self.ordering.update_line(0, move)
+            if searched is not None:
+                searched(move, best_score, best_move, alpha_0)
+            if self.pruning:
+                if value >= beta:
+                    break
+                alpha = max(alpha, value)
+        if tt is not None and best_move is not None:
+            tt.store(key, depth, best_score, alpha_0, beta,
+                     game.map_move(best_move, symmetry) if symmetry else best_move)
+        if self.ordering is not None:
+            self.ordering.finish_iteration()
+        return best_score, best_move
+
+    def start_search(self):
+        """Prepare a new search: restart the timer on the current
+        `time_left()`, clear `aborted` and choose whether the search counts
+        statistics. `search_root()` calls it; a search that calls `negamax()`
+        directly must call it first.
+        """
+        self.timer.restart(self.time_left)
+        self.aborted = False
+        self._counting = self.stats is not None
+        if self.tt is not None:
+            self._probe = self.tt.counted_probe if self._counting else self.tt.probe
+
+    def negamax(self, game, depth, alpha, beta, ply, color):
+        """Return the value of `game` searched to `depth` with the window
+        (`alpha`, `beta`), for the player to move: `color` is 1 if that is
+        the searching player and -1 if it is its opponent, whose values are
+        the negated scores of the searching player. `ply` is the distance
+        from the root.
+        """
+        if self.timer.expired():
+            self.aborted = True
+            return 0.
+        if depth == 0:
+            return color * self.score(game, self)
+        ordering = self.ordering
+        if ordering is not None:
+            ordering.clear_line(ply)
+        moves = game.get_legal_moves(shuffle=False, distinct=game.move_count < 2)
+        if not moves:
+            return color * self.score(game, self)
+        tt = self.tt
+        tt_move = None
+        if tt is not None:
+            key, symmetry = self.tt_key(
+                game, TranspositionTable.MAX_NODE if color > 0 else 0)
+            value, alpha, beta, tt_move = self._probe(key, depth, alpha, beta)
+            if value is not None:
+                return value
+            if tt_move is not None and symmetry:
+                tt_move = game.map_move(tt_move, symmetry, inverse=True)
+        moves = self.order_moves(moves, ply, tt_move)
+        best_score = float("-inf")
+        best_move = None
+        alpha_0 = alpha
+        pruning = self.pruning
+        for move in moves:
+            value = self._child_value(game, move, depth, alpha, beta, ply + 1,
+                                      color, move is not moves[0])
+            if self.aborted:
+                return 0.
+            if value > best_score:
+                best_score = value
+                best_move = move
+            if pruning:
+                if best_score >= beta:
+                    if self._counting:
+                        self.cutoffs += 1
+                        if move is moves[0]:
+                            self.first_cutoffs += 1
+                    if ordering is not None:
+                        ordering.cutoff(move, ply, depth)
+                    break
+                if best_score > alpha:
+                    alpha = best_score
+                    if ordering is not None:
+                        ordering.update_line(ply, move)
+        if tt is not None:
+            if symmetry and best_move is not None:
+                best_move = game.map_move(best_move, symmetry)
+            tt.store(key, depth, best_score, alpha_0, beta, best_move)
+        return best_score
+
+    def _child_value(self, game, move, depth, alpha, beta, ply, color, null_window):
+        """Return the value of `move` in `game` for the player making it,
+        searching the child with a null window first if `null_window` is
+        set and PVS is enabled.
+        """
+        game.apply_move(move)
+        if null_window and self.pvs:
+            value = -self.negamax(game, depth - 1, -math.nextafter(alpha, beta),
+                                  -alpha, ply, -color)
+            if alpha < value < beta and not self.aborted:
+                value = -self.negamax(game, depth - 1, -beta, -alpha, ply, -color)
+        else:
+            value = -self.negamax(game, depth - 1, -beta, -alpha, ply, -color)
+        game.undo_move()
+        return value
+
+    def tt_key(self, game, salt):
+        """Return the transposition table key of `game`, mixed with `salt`,
+        and the symmetry that maps moves of `game` to the moves stored in
+        the table.
+
+        The first `canonical_plies` positions of a game are keyed by their
+        canonical_hash(), so that symmetric positions share one entry; the
+        rest use the (cheaper) plain hash and the identity symmetry.
+        """
+        if game.move_count < self.canonical_plies:
+            key, symmetry = game.canonical_hash()
+            return key ^ salt, symmetry
+        return game.hash() ^ salt, 0
+
+    def order_moves(self, moves, ply, tt_move):
+        """Return `moves` in the order to search them at a node at distance
+        `ply` from the root, trying the transposition table move `tt_move`
+        (if it is one of them) first.
+        """
+        if self.ordering is not None:
+            return self.ordering.order(moves, ply, tt_move)
+        if tt_move is None or tt_move not in moves:
+            return moves
+        moves = list(moves)
+        moves.remove(tt_move)
+        moves.insert(0, tt_move)
+        return moves
+
+
+class SearchStats:
+    """Collects statistics about every move a player makes, to find
+    performance regressions and to tune agents on real games.
+
+    A player given a collector reports to it with `start_move()` when it is
+    asked for a move, `finish_iteration()` after every completed iteration
+    of iterative deepening, `aborted()` when an iteration runs out of time,
+    and `finish_move()` with the move it plays. The collector then turns the
+    counters kept by the search (the nodes counted by the player's
+    `Deadline`, the probes and hits of its `TranspositionTable` and the beta
+    cutoffs of the `NegamaxSearch`, the hits of an `EvaluationCache`) into
+    one record per move: a dict with
+
+    move_count, move
+        The number of moves played before the move, and the move.
+    search
+        How the move was chosen: "immediate" (a book move, the only legal
+        move or a solved endgame), "search", or "ponder" and "parallel" for
+        searches run in worker processes, which are not counted (their
+        records have a depth of 0 and no nodes).
+    time_available, time_used
+        The milliseconds left on the player's clock when it was asked for
+        the move, and the milliseconds it took to return it.
+    depth, interrupted
+        The depth of the last completed iteration, and whether the time ran
+        out within an iteration (rather than the search stopping between
+        iterations, see `TimeManager`).
+    nodes, nps
+        The number of nodes searched and the nodes searched per second.
+    ebf
+        The effective branching factor: the `growth_rate()` of the number of
+        nodes of the completed iterations (None for fewer than two).
+    first_cutoff_rate
+        The fraction of the beta cutoffs that were caused by the first move
+        searched at the node, a measure of the move ordering's quality.
+    tt_hit_rate
+        The fraction of the transposition table probes that found an entry.
+    eval_hit_rate
+        The fraction of the evaluations found in the player's
+        `EvaluationCache`, if its score function is one.
+
+    Rates are None when there is nothing to divide by. Without a collector
+    (the default) no statistics are computed or recorded, and the search
+    does not count table probes, hits or cutoffs either (see
+    `NegamaxSearch.start_search()`); only the nodes and the evaluation cache
+    hits are always counted.
+
+    Parameters
+    ----------
+    sink : callable or str (optional)
+        A function called with every record, or the path of a file to which
+        every record is appended as one line of JSON. Without a sink the
+        records are kept in the `records` list.
+    """
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.records = []
+        self._time_left = None
+        self._start = None
+        self._move_count = None
+        self._counters = None
+        self._iterations = []
+        self._interrupted = False
+
+    @staticmethod
+    def counters(player):
+        """Return the current `(nodes, tt probes, tt hits, cutoffs, first
+        move cutoffs, evaluation cache hits, evaluation cache misses)`
+        counters of `player`.
+        """
+        tt = getattr(player, "tt", None)
+        return (player.timer.nodes,
+                tt.probes if tt is not None else 0,
+                tt.hits if tt is not None else 0,
+                player.cutoffs, player.first_cutoffs,
+                getattr(player.score, "hits", 0),
+                getattr(player.score, "misses", 0))
+
+    def start_move(self, player, game, time_left):
+        """Start recording the move of `player` in `game`, timed with the
+        clock `time_left` that the player was given for it.
+        """
+        self._time_left = time_left
+        self._start = time_left()
+        self._move_count = game.move_count
+        self._counters = self.counters(player)
+        self._iterations = []
+        self._interrupted = False
+
+    def finish_iteration(self, player, depth):
+        """Record that `player` completed the iteration of `depth`."""
+        self._iterations.append((depth, player.timer.nodes))
+
+    def aborted(self):
+        """Record that the time ran out within an iteration."""
+        self._interrupted = True
+
+    def finish_move(self, player, move, search):
+        """Record that `player` plays `move`, chosen as described by `search`
+        (see above), and pass the record to the sink.
+        """
+        time_used = self._start - self._time_left()
+        nodes, probes, hits, cutoffs, first_cutoffs, eval_hits, eval_misses = [
+            now - before for now, before in
+            zip(self.counters(player), self._counters)]
+        start_nodes = self._counters[0]
+        iteration_nodes = []
+        for _, total in self._iterations:
+            iteration_nodes.append(total - start_nodes)
+            start_nodes = total
+        record = dict(
+            move_count=self._move_count,
+            move=list(move) if move is not None else None,
+            search=search,
+            time_available=self._start,
+            time_used=time_used,
+            depth=self._iterations[-1][0] if self._iterations else 0,
+            interrupted=self._interrupted,
+            nodes=nodes,
+            nps=nodes * 1000. / time_used if time_used > 0 else None,
+            ebf=growth_rate(iteration_nodes),
+            first_cutoff_rate=first_cutoffs / cutoffs if cutoffs else None,
+            tt_hit_rate=hits / probes if probes else None,
+            eval_hit_rate=(eval_hits / (eval_hits + eval_misses)
+                           if eval_hits + eval_misses else None))
+        self.emit(record)
+        return record
+
+    def emit(self, record):
+        """Pass `record` to the sink, or keep it if there is none."""
+        if self.sink is None:
+            self.records.append(record)
+        elif callable(self.sink):
+            self.sink(record)
+        else:
+            with open(self.sink, "a") as log_file:
+                log_file.write(json.dumps(record) + "\n")
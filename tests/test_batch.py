@@ -0,0 +1,105 @@
+import random
+import unittest
+
+import game_agent
+import sample_players
+
+try:
+    import numpy as np
+    from isolation.batch import (BatchBoard, MinimaxAgent, PlayerAgent,
+                                 RandomAgent, play_batch)
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "the batch engine requires numpy")
+class BatchBoardTest(unittest.TestCase):
+    """Unit tests for the numpy batched board engine"""
+
+    def random_batch(self, n, seed):
+        """Return a batch of n games advanced by random moves, with both
+        players placed in every game.
+        """
+        batch = BatchBoard(n)
+        agent = RandomAgent(seed)
+        for _ in range(random.Random(seed).randint(2, 20)):
+            moves = agent.get_moves(batch)
+            if (moves < 0).any():
+                break
+            batch.apply_moves(moves)
+        return batch
+
+    def test_legal_moves_match_board(self):
+        batch = self.random_batch(20, 1)
+        legal = batch.legal_moves()
+        for i in range(len(batch)):
+            game = batch.to_board(i, "Player1", "Player2")
+            expected = sorted(r + c * game.height
+                              for r, c in game.get_legal_moves())
+            self.assertEqual(expected, list(np.flatnonzero(legal[i])))
+
+    def test_minimax_agent_matches_minimax_player(self):
+        scores = [(1, "open", sample_players.open_move_score),
+                  (3, "improved", sample_players.improved_score)]
+        for seed in range(5):
+            batch = self.random_batch(10, seed)
+            for depth, name, score_fn in scores:
+                moves = MinimaxAgent(depth, name).get_moves(batch)
+                for i in np.flatnonzero(moves >= 0):
+                    player = game_agent.MinimaxPlayer(depth, score_fn)
+                    player.time_left = lambda: float("inf")
+                    opponent = "Opponent"
+                    if batch.move_count[i] & 1:
+                        game = batch.to_board(i, opponent, player)
+                    else:
+                        game = batch.to_board(i, player, opponent)
+                    values = {m: player.min_value(game.forecast_move(m), depth - 1)
+                              for m in game.get_legal_moves()}
+                    chosen = (moves[i] % game.height, moves[i] // game.height)
+                    self.assertEqual(max(values.values()), values[chosen])
+
+    def test_play_batch(self):
+        winners, batch = play_batch(MinimaxAgent(2), RandomAgent(0), 50, seed=0)
+        self.assertEqual(len(winners), 50)
+        self.assertTrue(((winners == 0) | (winners == 1)).all())
+        self.assertTrue((batch.count_legal_moves() == 0).all())
+
+    def test_illegal_moves_forfeit(self):
+        class FixedPlayer:
+            def __init__(self, move):
+                self.move = move
+
+            def get_move(self, game, time_left):
+                return self.move
+
+        class FirstCellAgent:
+            def get_moves(self, batch):
+                return np.zeros(len(batch), dtype=np.intp)
+
+        # players returning no move, and a batch agent repeating the move
+        # to cell 0 once it is blocked, lose on their first illegal move
+        for agent, plies in [(PlayerAgent(FixedPlayer(None)), 0),
+                             (PlayerAgent(FixedPlayer((-1, -1))), 0),
+                             (FirstCellAgent(), 2)]:
+            for loser in [0, 1]:
+                agents = (agent, RandomAgent(1)) if loser == 0 else (RandomAgent(1), agent)
+                winners, batch = play_batch(*agents, 5, opening_plies=0, seed=0)
+                self.assertTrue((winners == 1 - loser).all())
+                self.assertTrue(batch.forfeits.all())
+                self.assertTrue((batch.move_count == plies + loser).all())
+
+        # the player is not asked for moves in games already forfeited
+        asked = []
+        class CountingPlayer(FixedPlayer):
+            def get_move(self, game, time_left):
+                asked.append(game)
+                return self.move
+
+        batch = self.random_batch(4, 2)
+        batch.forfeit(np.array([0, 2]))
+        moves = PlayerAgent(CountingPlayer(None)).get_moves(batch)
+        self.assertEqual(2, len(asked))
+        self.assertTrue((moves == -1).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,260 @@
+import random
+import unittest
+
+import isolation
+
+
+class BoardTest(unittest.TestCase):
+    """Unit tests for the isolation board engines"""
+
+    def setUp(self):
+        self.player1 = "Player1"
+        self.player2 = "Player2"
+
+    def play_random(self, board_cls, seed, width=7, height=7):
+        """Play a random game on a board of the given class and return the
+        sequence of (hash, sorted legal moves, utility) observed along it.
+        """
+        rng = random.Random(seed)
+        game = board_cls(self.player1, self.player2, width, height)
+        trace = []
+        while True:
+            moves = sorted(game.get_legal_moves())
+            trace.append((game.hash(), moves, game.utility(self.player1),
+                          game.to_string()))
+            if not moves:
+                return trace
+            game = game.forecast_move(rng.choice(moves))
+
+    def test_bitboard_matches_board(self):
+        for seed in range(10):
+            for width, height in [(7, 7), (5, 8)]:
+                expected = self.play_random(isolation.Board, seed, width, height)
+                actual = self.play_random(isolation.BitBoard, seed, width, height)
+                self.assertEqual(expected, actual)
+
+    def test_knight_move_tables(self):
+        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                      (1, -2), (1, 2), (2, -1), (2, 1)]
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            for width, height in [(7, 7), (5, 8), (3, 4)]:
+                for r in range(height):
+                    for c in range(width):
+                        expected = sorted(
+                            (r + dr, c + dc) for dr, dc in directions
+                            if 0 <= r + dr < height and 0 <= c + dc < width)
+                        game = board_cls(self.player1, self.player2, width, height)
+                        game.apply_move((r, c))
+                        self.assertEqual(expected,
+                                         sorted(game.get_legal_moves(self.player1)))
+                        if expected:
+                            # a blocked destination is no longer a legal move
+                            game.apply_move(expected[0])
+                            self.assertEqual(expected[1:],
+                                             sorted(game.get_legal_moves(self.player1)))
+            self.assertIs(isolation.Board._get_neighbors(5, 8),
+                          isolation.Board._get_neighbors(5, 8))
+
+    def test_hash_transpositions(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            game_a = board_cls(self.player1, self.player2)
+            game_b = board_cls(self.player1, self.player2)
+            for move in [(2, 2), (2, 4), (0, 3), (4, 3)]:
+                game_a.apply_move(move)
+            for move in [(2, 4), (2, 2), (0, 3), (4, 3)]:
+                game_b.apply_move(move)
+            self.assertEqual(game_a.hash(), game_b.hash())
+            self.assertNotEqual(game_a.hash(),
+                                game_a.forecast_move((2, 1)).hash())
+            self.assertNotEqual(game_a.hash(),
+                                game_a.forecast_move((2, 5)).hash())
+
+    def test_copy_is_independent(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            rng = random.Random(11)
+            game = board_cls(self.player1, self.player2)
+            self.assertFalse(hasattr(game, "__dict__"))
+            with self.assertRaises(AttributeError):
+                game.extra_state = None
+            self.assertIsNone(game.get_player_location(self.player1))
+            while game.get_legal_moves():
+                state = (game.hash(), game.to_string(), game.move_count,
+                         game.active_player, sorted(game.get_legal_moves()),
+                         game.get_player_location(self.player1),
+                         game.get_player_location(self.player2))
+                child = game.copy()
+                for _ in range(3):
+                    if not child.get_legal_moves():
+                        break
+                    child.apply_move(rng.choice(child.get_legal_moves()))
+                self.assertEqual(state,
+                                 (game.hash(), game.to_string(), game.move_count,
+                                  game.active_player, sorted(game.get_legal_moves()),
+                                  game.get_player_location(self.player1),
+                                  game.get_player_location(self.player2)))
+                game.apply_move(rng.choice(game.get_legal_moves()))
+
+    def test_undo_move_restores_state(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            rng = random.Random(3)
+            game = board_cls(self.player1, self.player2)
+            states = []
+            while game.get_legal_moves():
+                states.append((game.hash(), game.to_string(), game.move_count,
+                               game.active_player))
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            while states:
+                game.undo_move()
+                self.assertEqual(states.pop(),
+                                 (game.hash(), game.to_string(),
+                                  game.move_count, game.active_player))
+            self.assertRaises(RuntimeError, game.undo_move)
+
+    def test_seeded_move_order(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            orders = []
+            for _ in range(2):
+                game = board_cls(self.player1, self.player2, seed=42)
+                game.apply_move((3, 3))
+                game.apply_move((0, 0))
+                orders.append([game.get_legal_moves() for _ in range(5)])
+                self.assertEqual(len(orders[-1][0]), game.count_legal_moves())
+                self.assertEqual(sorted(orders[-1][0]),
+                                 sorted(game.get_legal_moves(shuffle=False)))
+            self.assertEqual(orders[0], orders[1])
+
+    def test_mobility_matches_move_lists(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            rng = random.Random(5)
+            game = board_cls(self.player1, self.player2)
+            while True:
+                for player in [self.player1, self.player2]:
+                    opponent = game.get_opponent(player)
+                    expected = (len(game.get_legal_moves(player)),
+                                len(game.get_legal_moves(opponent)),
+                                game.utility(player))
+                    self.assertEqual(expected, game.mobility(player))
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(rng.choice(moves))
+        # errors name the method that rejected the player
+        self.assertRaisesRegex(RuntimeError, "_player_moves",
+                               isolation.Board(self.player1, self.player2).get_legal_moves,
+                               "Player3")
+        self.assertRaisesRegex(RuntimeError, "in mobility",
+                               isolation.BitBoard(self.player1, self.player2).mobility,
+                               "Player3")
+        self.assertRaisesRegex(RuntimeError, "_location_idx",
+                               isolation.BitBoard(self.player1, self.player2).count_legal_moves,
+                               "Player3")
+
+    def test_serialization_round_trip(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            rng = random.Random(7)
+            game = board_cls(self.player1, self.player2)
+            games = []
+            while True:
+                games.append(game)
+                data = game.to_bytes()
+                self.assertEqual(16, len(data))
+                self.assertLess(game.to_int(), 1 << 64)
+                for restored in [
+                        board_cls.from_bytes(data, self.player1, self.player2),
+                        board_cls.from_int(game.to_int(), self.player1,
+                                           self.player2)]:
+                    self.assertEqual(game.hash(), restored.hash())
+                    self.assertEqual(game.to_string(), restored.to_string())
+                    self.assertEqual(game.move_count, restored.move_count)
+                    self.assertEqual(game.active_player, restored.active_player)
+                    self.assertEqual(sorted(game.get_legal_moves()),
+                                     sorted(restored.get_legal_moves()))
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game = game.forecast_move(rng.choice(moves))
+            data = isolation.encode_boards(games)
+            decoded = isolation.decode_boards(data, self.player1, self.player2)
+            self.assertEqual([g.hash() for g in games],
+                             [g.hash() for g in decoded])
+
+    def test_distinct_opening_moves(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            game = board_cls(self.player1, self.player2)
+            self.assertEqual(10, len(game.get_legal_moves(distinct=True)))
+            game.apply_move((3, 3))
+            self.assertEqual(9, len(game.get_legal_moves(distinct=True)))
+            # every legal move must lead to the same position as a distinct
+            # move, up to symmetry
+            for first in [(0, 3), (1, 2)]:
+                game = board_cls(self.player1, self.player2)
+                game.apply_move(first)
+                distinct = set(game.get_legal_moves(distinct=True))
+                symmetries = isolation.Board._get_symmetries(7, 7)
+                for r, c in game.get_legal_moves():
+                    idx = r + c * 7
+                    orbit = [(perm[idx] % 7, perm[idx] // 7)
+                             for perm in symmetries
+                             if perm[first[0] + first[1] * 7] == first[0] + first[1] * 7]
+                    self.assertTrue(distinct.intersection(orbit))
+            game.apply_move((0, 0))
+            self.assertEqual(sorted(game.get_legal_moves()),
+                             sorted(game.get_legal_moves(distinct=True)))
+
+    def test_canonical_hash(self):
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            for width, height in [(7, 7), (5, 8)]:
+                rng = random.Random(width)
+                history = []
+                game = board_cls(self.player1, self.player2, width, height)
+                while game.get_legal_moves():
+                    history.append(rng.choice(game.get_legal_moves()))
+                    game.apply_move(history[-1])
+                    key, symmetry = game.canonical_hash()
+                    self.assertLessEqual(key, game.hash())
+                    canonical = board_cls(self.player1, self.player2, width, height)
+                    for move in history:
+                        canonical.apply_move(game.map_move(move, symmetry))
+                    self.assertEqual(key, canonical.hash())
+                    # replaying the game in every orientation gives the same key
+                    for other in range(len(isolation.Board._get_symmetries(width, height))):
+                        image = board_cls(self.player1, self.player2, width, height)
+                        for move in history:
+                            image.apply_move(game.map_move(move, other))
+                        self.assertEqual(key, image.canonical_hash()[0])
+                    for move in canonical.get_legal_moves():
+                        self.assertIn(game.map_move(move, symmetry, inverse=True),
+                                      game.get_legal_moves())
+
+    def test_longest_path(self):
+        def longest(loc, blanks):
+            best = 0
+            for dr, dc in [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                           (1, -2), (1, 2), (2, -1), (2, 1)]:
+                move = (loc[0] + dr, loc[1] + dc)
+                if move in blanks:
+                    best = max(best, 1 + longest(move, blanks - {move}))
+            return best
+
+        for board_cls in [isolation.Board, isolation.BitBoard]:
+            rng = random.Random(3)
+            game = board_cls(self.player1, self.player2)
+            memo = {}
+            while game.get_legal_moves():
+                if len(game.get_blank_spaces()) <= 20:
+                    path = game.longest_path()
+                    self.assertEqual(len(path), len(game.longest_path(memo=memo)))
+                    self.assertTrue(0 < len(memo) <= isolation.Board.PATH_MEMO_SIZE)
+                    loc = game.get_player_location(game.active_player)
+                    blanks = set(game.get_blank_spaces())
+                    self.assertEqual(longest(loc, blanks), len(path))
+                    for move in path:
+                        self.assertEqual(2, abs((move[0] - loc[0]) * (move[1] - loc[1])))
+                        blanks.remove(move)
+                        loc = move
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            self.assertFalse(board_cls(self.player1, self.player2).is_partitioned())
+
+
+if __name__ == '__main__':
+    unittest.main()
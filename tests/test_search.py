@@ -0,0 +1,470 @@
+import gc
+import json
+import os
+import random
+import tempfile
+import timeit
+import unittest
+import weakref
+
+import isolation
+import competition_agent
+import game_agent
+
+from heuristics import center_cells, degree_score, degree_weights, knight_degrees
+from opening_book import OpeningBook, build_book, opening_positions
+from search import (Deadline, EvaluationCache, MoveOrdering, SearchStats,
+                    TimeManager, TranspositionTable, solve_endgame)
+
+
+class SearchTest(unittest.TestCase):
+    """Unit tests for the shared search components"""
+
+    def random_game(self, player_1, player_2, seed, plies):
+        """Return a board advanced by `plies` random moves (fewer if the game
+        ends first).
+        """
+        rng = random.Random(seed)
+        game = isolation.Board(player_1, player_2, seed=seed)
+        for _ in range(plies):
+            moves = game.get_legal_moves(shuffle=False)
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        return game
+
+    def test_table_bounds_and_replacement(self):
+        tt = TranspositionTable(4)
+        tt.store(5, 3, 2., float("-inf"), float("inf"), (0, 1))
+        self.assertEqual((2., 0., 1., (0, 1)), tt.probe(5, 3, 0., 1.))
+        self.assertEqual((None, 0., 4., (0, 1)), tt.probe(5, 4, 0., 4.))
+        # a fail-high result is only a lower bound
+        tt.store(6, 2, 7., 0., 5., (1, 1))
+        self.assertEqual((None, 7., 9., (1, 1)), tt.probe(6, 2, 0., 9.))
+        self.assertEqual(7., tt.probe(6, 1, 0., 6.)[0])
+        # the deeper entry is kept within a search, but not across searches
+        tt.store(9, 1, 0., 0., 1., (2, 2))
+        self.assertEqual((0, 1), tt.probe(5, 0, 0., 1.)[3])
+        self.assertEqual(None, tt.probe(9, 0, 0., 1.)[3])
+        tt.new_search()
+        tt.store(10, 1, 0., 0., 1., (2, 2))
+        self.assertEqual(None, tt.probe(6, 0, 0., 1.)[3])
+        self.assertEqual((2, 2), tt.probe(10, 0, 0., 1.)[3])
+
+    def test_evaluation_cache(self):
+        calls = []
+        def score(game, player):
+            calls.append(player)
+            return float(len(game.get_legal_moves(player)))
+
+        cache = EvaluationCache(score, 4)
+        game = self.random_game("Player1", "Player2", 1, 6)
+        for player in ["Player1", "Player2", "Player1"]:
+            self.assertEqual(score(game, player), cache(game, player))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        # the perspective is the seat of the player, whoever sits there
+        swapped = isolation.Board.from_bytes(game.to_bytes(), "Other", "Player2")
+        self.assertEqual(score(game, "Player1"), cache(swapped, "Other"))
+        self.assertEqual(2, cache.hits)
+        # a colliding position replaces the cached value
+        cache = EvaluationCache(score, 1)
+        child = game.forecast_move(game.get_legal_moves()[0])
+        for position in [game, child, game]:
+            cache(position, "Player1")
+        self.assertEqual((0, 3, 1), (cache.hits, cache.misses, len(cache)))
+        # searches return the same results with a cache
+        for seed in range(5):
+            results = []
+            for score_fn in [game_agent.custom_score_3,
+                             EvaluationCache(game_agent.custom_score_3, 1 << 10)]:
+                player = game_agent.AlphaBetaPlayer(score_fn=score_fn, tt_size=0)
+                player.time_left = lambda: 1000.
+                game = self.random_game(player, "Opponent", seed, 4)
+                results.append([(player.alphabeta(game, depth), player._score)
+                                for depth in [1, 2, 3, 4, 3]])
+            self.assertEqual(results[0], results[1])
+            self.assertGreater(score_fn.hits, 0)
+
+    def test_move_ordering(self):
+        ordering = MoveOrdering()
+        moves = [(0, 0), (1, 2), (2, 1), (3, 3), (4, 4)]
+        ordering.cutoff((3, 3), 1, 1)
+        ordering.cutoff((2, 1), 1, 2)
+        self.assertEqual([(2, 1), (3, 3), (0, 0), (1, 2), (4, 4)],
+                         ordering.order(moves, 1))
+        # killers are per ply, the history table is shared by all plies
+        ordering.cutoff((0, 0), 2, 1)
+        self.assertEqual([(0, 0), (2, 1), (3, 3), (1, 2), (4, 4)],
+                         ordering.order(moves, 2))
+        self.assertEqual((4, 4), ordering.order(moves, 2, (4, 4))[0])
+        ordering.clear_line(0)
+        ordering.clear_line(1)
+        ordering.update_line(1, (1, 2))
+        ordering.update_line(0, (4, 4))
+        ordering.finish_iteration()
+        self.assertEqual(((4, 4), (1, 2)), ordering.pv)
+        self.assertEqual((1, 2), ordering.order(moves, 1)[0])
+
+    def test_time_manager(self):
+        manager = TimeManager()
+        self.assertTrue(manager.next_iteration(10.))
+        self.assertFalse(manager.next_iteration(0.))
+        left = 100.
+        for depth, cost in enumerate([2., 6., 18.], 1):
+            manager.start_iteration(left)
+            manager.searched(left - cost / 2, (1, 2), 1., (1, 2), float("-inf"))
+            left -= cost
+            manager.finish_iteration(left, depth, 1., (1, 2))
+        self.assertAlmostEqual(3., manager.ebf())
+        # the first move of the next iteration takes about 27ms
+        self.assertTrue(manager.next_iteration(27. / TimeManager.MARGIN + .1))
+        self.assertFalse(manager.next_iteration(27. / TimeManager.MARGIN - .1))
+        # an interrupted iteration is kept once the previous best move has
+        # been searched, and only then
+        manager.start_iteration(left)
+        self.assertIsNone(manager.partial_result(4))
+        manager.start_iteration(left)
+        manager.searched(left - 1, (1, 2), 1., (1, 2), float("-inf"))
+        manager.searched(left - 2, (2, 1), 3., (2, 1), float("-inf"))
+        self.assertEqual((4, 3., (2, 1)), manager.partial_result(4))
+        manager.start_iteration(left)
+        manager.searched(left - 1, (2, 1), 3., (2, 1), float("-inf"))
+        self.assertIsNone(manager.partial_result(4))
+        # while the best move changes the time is used up
+        manager.start_iteration(left)
+        manager.finish_iteration(left - 20, 4, 1., (2, 1))
+        self.assertTrue(manager.next_iteration(1.))
+        # a proven result ends the search
+        manager.start_iteration(left)
+        manager.finish_iteration(left - 1, 4, float("inf"), (1, 2))
+        self.assertFalse(manager.next_iteration(1000.))
+
+    def test_deadline(self):
+        now = [0.]
+        polls = [0]
+        def time_left():
+            polls[0] += 1
+            return 100. - now[0]
+
+        timer = Deadline(time_left, 10.)
+        nodes = 0
+        while not timer.expired():
+            # one node per microsecond
+            now[0] += .001
+            nodes += 1
+        self.assertGreaterEqual(now[0], 90.)
+        self.assertLess(now[0], 90.01)
+        self.assertLess(polls[0], nodes / 100)
+        self.assertEqual(nodes + 1, timer.nodes)
+        self.assertTrue(timer.expired())
+        timer.restart()
+        self.assertEqual(nodes + 2, timer.nodes)
+
+    def test_players_freed_without_gc(self):
+        # a player left in a reference cycle keeps its tables until a full
+        # collection, which then pauses the search of a later game
+        gc.disable()
+        try:
+            for player_cls in [game_agent.AlphaBetaPlayer, competition_agent.CustomPlayer]:
+                player = player_cls()
+                game = isolation.Board(player, game_agent.AlphaBetaPlayer(), seed=1)
+                game.play(100)
+                freed = weakref.ref(player)
+                del player, game
+                self.assertIsNone(freed(), player_cls.__name__)
+        finally:
+            gc.enable()
+
+    def test_single_reply(self):
+        player = game_agent.AlphaBetaPlayer(endgame=False)
+        # a position with one legal move is played without searching
+        player.alphabeta = None
+        found = 0
+        for seed in range(10):
+            game = self.random_game(player, "Opponent", seed, 0)
+            while game.get_legal_moves():
+                if game.active_player is player and game.count_legal_moves() == 1:
+                    self.assertEqual(game.get_legal_moves(),
+                                     [player.get_move(game, lambda: 100.)])
+                    found += 1
+                game.apply_move(game.get_legal_moves()[0])
+        self.assertGreater(found, 0)
+
+    def test_search_stats(self):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        try:
+            records = []
+            player = game_agent.AlphaBetaPlayer(
+                score_fn=EvaluationCache(game_agent.custom_score_3),
+                stats=SearchStats(records.append))
+            competitor = competition_agent.CustomPlayer(timeout=10., stats=SearchStats(path))
+            game = isolation.Board(player, competitor, seed=1)
+            game.play(time_limit=100)
+            with open(path) as log_file:
+                logged = [json.loads(line) for line in log_file]
+        finally:
+            os.remove(path)
+        for moves in [records, logged]:
+            self.assertTrue(moves)
+            for record in moves:
+                self.assertIn(record["search"], ["immediate", "search"])
+                self.assertGreater(record["time_available"], 0)
+                self.assertGreaterEqual(record["time_used"], 0)
+                if record["search"] == "search" and record["move"] is not None:
+                    self.assertGreater(record["depth"], 0)
+                    self.assertGreater(record["nodes"], 0)
+            self.assertTrue(any(record["ebf"] for record in moves))
+            self.assertTrue(any(record["first_cutoff_rate"] for record in moves))
+        self.assertTrue(any(record["tt_hit_rate"] for record in records))
+        self.assertTrue(any(record["eval_hit_rate"] for record in records))
+        self.assertTrue(all(record["eval_hit_rate"] is None for record in logged))
+        self.assertEqual([0, 2], [record["move_count"] for record in records[:2]])
+
+        # a clock that runs out between two iterations does not interrupt one
+        remaining = [1000.]
+        stats = SearchStats()
+        finish_iteration = stats.finish_iteration
+        def finish(player, depth):
+            finish_iteration(player, depth)
+            if depth == 2:
+                remaining[0] = 0.
+        stats.finish_iteration = finish
+        player = game_agent.AlphaBetaPlayer(endgame=False, time_management=False,
+                                            stats=stats)
+        game = self.random_game(player, "Opponent", 1, 2)
+        player.get_move(game, lambda: remaining[0])
+        self.assertEqual((2, False), (stats.records[0]["depth"],
+                                      stats.records[0]["interrupted"]))
+
+        # without a collector the search counts nothing
+        player = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player, competition_agent.CustomPlayer(timeout=10.), seed=1)
+        game.play(time_limit=100)
+        self.assertEqual((0, 0, 0, 0), (player.tt.probes, player.tt.hits,
+                                        player.cutoffs, player.first_cutoffs))
+
+    def test_degree_heuristics(self):
+        self.assertEqual((2, 3, 4, 4, 4, 3, 2), knight_degrees(7, 7)[0])
+        self.assertEqual({(3, 3)}, center_cells(7, 7))
+        self.assertEqual({(3, 3), (3, 4), (4, 3), (4, 4)}, center_cells(8, 8))
+        for width, height in [(5, 8), (9, 9)]:
+            # the degree of a cell is the number of moves out of it on an
+            # empty board
+            for r in range(height):
+                for c in range(width):
+                    game = isolation.Board("Player1", "Player2", width, height)
+                    game.apply_move((r, c))
+                    self.assertEqual(len(game.get_legal_moves("Player1")),
+                                     knight_degrees(width, height)[r][c])
+            weights = degree_weights(width, height, 2)
+            self.assertIs(weights, degree_weights(width, height, 2))
+            rng = random.Random(width)
+            game = isolation.Board("Player1", "Player2", width, height)
+            while game.get_legal_moves():
+                game.apply_move(rng.choice(game.get_legal_moves()))
+                for player in ["Player1", "Player2"]:
+                    opponent = game.get_opponent(player)
+                    expected = game.utility(player) or (
+                        sum(weights[r][c] for r, c in game.get_legal_moves(player)) -
+                        sum(weights[r][c] for r, c in game.get_legal_moves(opponent)))
+                    self.assertEqual(expected, degree_score(game, player, 2))
+
+    def test_alphabeta_with_table_matches_minimax(self):
+        for seed in range(6):
+            player = game_agent.AlphaBetaPlayer()
+            player.time_left = lambda: float("inf")
+            game = self.random_game(player, "Opponent", seed, 2 * seed + 2)
+            player.tt.new_search()
+            for depth in range(1, 5):
+                move = player.alphabeta(game, depth)
+                if move is None:
+                    break
+                # score every root move with a full window and no table
+                tt, player.tt = player.tt, None
+                values = {m: player.min_value(game.forecast_move(m), depth - 1,
+                                              float("-inf"), float("inf"))
+                          for m in game.get_legal_moves()}
+                player.tt = tt
+                self.assertEqual(max(values.values()), values[move])
+
+    def test_aborted_search_restores_board(self):
+        for in_place in [False, True]:
+            player = game_agent.AlphaBetaPlayer(in_place=in_place)
+            game = self.random_game(player, "Opponent", 3, 4)
+            state = (game.hash(), game.to_string(), game.move_count)
+            nodes = []
+            # run out of time after 500 nodes
+            player.time_left = lambda: 1000. if len(nodes) < 500 else 0.
+            player.timer.expired = lambda: nodes.append(None) or player.time_left() < 15.
+            self.assertIsNone(player.search_root(game, 8, game.get_legal_moves()))
+            self.assertTrue(player.aborted)
+            self.assertEqual(500, len(nodes))
+            self.assertEqual(state, (game.hash(), game.to_string(), game.move_count))
+            self.assertRaises(game_agent.SearchTimeout, player.alphabeta, game, 8)
+
+    def test_pvs_and_aspiration_match_alphabeta(self):
+        options = [dict(pvs=True), dict(aspiration=1.), dict(pvs=True, aspiration=.5),
+                   dict(pvs=True, tt_size=0, ordering=False), dict(canonical_plies=50)]
+        for seed in range(4):
+            plain = game_agent.AlphaBetaPlayer()
+            plain.time_left = lambda: float("inf")
+            game = self.random_game(plain, "Opponent", seed, 2 * seed + 2)
+            expected = []
+            for depth in range(1, 6):
+                plain.alphabeta(game, depth)
+                expected.append(plain._score)
+            for kwargs in options:
+                player = game_agent.AlphaBetaPlayer(**kwargs)
+                player.time_left = lambda: float("inf")
+                game = self.random_game(player, "Opponent", seed, 2 * seed + 2)
+                scores = []
+                for depth in range(1, 6):
+                    if depth > 1 and player.aspiration and abs(scores[-1]) != float("inf"):
+                        player.aspiration_search(game, depth, scores[-1])
+                    else:
+                        player.alphabeta(game, depth)
+                    scores.append(player._score)
+                self.assertEqual(expected, scores, kwargs)
+
+    def test_solve_endgame(self):
+        def value(game):
+            # exact game value for the active player by exhaustive search
+            moves = game.get_legal_moves(shuffle=False)
+            if not moves:
+                return float("-inf")
+            return max(-value(game.forecast_move(m)) for m in moves)
+
+        solved = 0
+        for seed in range(40):
+            game = self.random_game("Player1", "Player2", seed, 24)
+            while game.get_legal_moves():
+                if game.is_partitioned() and len(game.get_blank_spaces()) <= 18:
+                    result, move = solve_endgame(game)
+                    self.assertEqual(value(game), result)
+                    self.assertEqual(result, -value(game.forecast_move(move)))
+                    solved += 1
+                game.apply_move(game.get_legal_moves(shuffle=False)[0])
+        self.assertGreater(solved, 10)
+
+    def test_parallel_search(self):
+        player = game_agent.AlphaBetaPlayer(workers=2)
+        try:
+            for seed in range(3):
+                game = self.random_game(player, "Opponent", seed, 2)
+                start = timeit.default_timer()
+                time_left = lambda: 150 - 1000 * (timeit.default_timer() - start)
+                move = player.get_move(game, time_left)
+                self.assertGreater(time_left(), 0)
+                self.assertIn(move, game.get_legal_moves())
+        finally:
+            player.close()
+
+        inf = float("inf")
+        deep = [(1, 2., (0, 0)), (2, 1., (0, 0)), (3, 5., (1, 2))]
+        shallow = [(1, 1., (3, 3)), (2, 3., (4, 4))]
+        # compared at the deepest depth completed by all workers
+        self.assertEqual((2, 3., (4, 4)), game_agent._best_iteration([deep, shallow]))
+        # a proven loss does not limit the depth, a proven win is played
+        lost = [(1, 0., (5, 5)), (2, -inf, (5, 5))]
+        self.assertEqual((3, 5., (1, 2)), game_agent._best_iteration([lost, deep]))
+        self.assertEqual((2, -inf, (5, 5)), game_agent._best_iteration([lost]))
+        won = [(1, 0., (6, 6)), (2, inf, (6, 1))]
+        self.assertEqual((2, inf, (6, 1)), game_agent._best_iteration([deep, won]))
+
+    def test_mcts_reuses_tree(self):
+        player = game_agent.MCTSPlayer(seed=1)
+        opponent = game_agent.MCTSPlayer(seed=2)
+        game = isolation.Board(player, opponent, seed=1)
+        for _ in range(3):
+            start = timeit.default_timer()
+            time_left = lambda: 100 - 1000 * (timeit.default_timer() - start)
+            move = player.get_move(game.copy(), time_left)
+            self.assertGreater(time_left(), 0)
+            self.assertIn(move, game.get_legal_moves())
+            game.apply_move(move)
+            kept = {child.key: child.visits for child in player._root.children}
+            start = timeit.default_timer()
+            game.apply_move(opponent.get_move(game.copy(), time_left))
+            root = player.find_root(game)
+            self.assertEqual(kept.get(game.hash(), 0), root.visits)
+            self.assertGreater(root.visits, 0)
+
+    def play_pondering_games(self, player):
+        """Play a game with pondering and one without between the pondering
+        `player` and a regular one, and return their outcomes as `(loser is
+        player, outcome)`.
+        """
+        results = []
+        for seed, ponder in [(0, True), (1, False)]:
+            opponent = game_agent.AlphaBetaPlayer()
+            game = isolation.Board(player, opponent, seed=seed)
+            winner, history, outcome = game.play(100, ponder=ponder)
+            results.append((winner is opponent, outcome))
+        return results
+
+    def test_pondering(self):
+        player = game_agent.AlphaBetaPlayer(pondering=True)
+        try:
+            # the pondering process is idle while the player waits for it
+            for lost, outcome in self.play_pondering_games(player):
+                if lost:
+                    self.assertNotEqual("timeout", outcome)
+                    self.assertNotEqual("forfeit", outcome)
+            # a search that is stopped ends at once, even though the next
+            # search moves the shared deadline
+            game = isolation.Board(player, "Opponent", seed=2)
+            game.apply_move(game.get_legal_moves()[0])
+            player.ponder(game.copy(), 10000)
+            stopped = player._job
+            player.ponder(game.copy(), 10000)
+            stopped.wait(1.)
+            self.assertTrue(stopped.ready())
+            player.stop_search(1.)
+        finally:
+            player.close()
+
+    # With a single CPU the pondering process takes turns with the opponent's
+    # search, which is then stalled for 12-20 ms at a time (more than the
+    # 15 ms TIMER_THRESHOLD) and may lose on time through no fault of either
+    # player; only the pondering player is checked there (see above)
+    @unittest.skipIf((os.cpu_count() or 1) < 2,
+                     "the pondering process stalls the opponent on a single CPU")
+    def test_pondering_opponent_keeps_time(self):
+        player = game_agent.AlphaBetaPlayer(pondering=True)
+        try:
+            for _, outcome in self.play_pondering_games(player):
+                self.assertNotEqual("timeout", outcome)
+                self.assertNotEqual("forfeit", outcome)
+        finally:
+            player.close()
+
+    def test_opening_book(self):
+        self.assertEqual([1, 11], [len(opening_positions(p)) for p in range(2)])
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.assertEqual(11, build_book(path, plies=1, depth=2, processes=2))
+            book = OpeningBook(path)
+            self.assertEqual(11, len(book))
+            player = game_agent.AlphaBetaPlayer(book=book)
+            for first in [None, (2, 5), (5, 2), (0, 0), (6, 6)]:
+                game = isolation.Board("Opponent", player)
+                if first is not None:
+                    game.apply_move(first)
+                move = book.lookup(game)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(move, player.get_move(game, lambda: 0.001))
+            # symmetric positions share an entry: (6, 6) is the image of
+            # (0, 0) by a half turn, and both are on the main diagonal
+            r, c = book.lookup(isolation.Board("Opponent", player).forecast_move((0, 0)))
+            self.assertIn(move, [(6 - r, 6 - c), (6 - c, 6 - r)])
+            game.apply_move(move)
+            self.assertIsNone(book.lookup(game))
+            book.close()
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,8 +20,8 @@ from collections import namedtuple
 from isolation import Board
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
-from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
-                        custom_score_2, custom_score_3)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, MCTSPlayer,
+                        custom_score, custom_score_2, custom_score_3)
 
 NUM_MATCHES = 5 # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -31,7 +31,8 @@ This script evaluates the performance of the custom_score evaluation
 function against a baseline agent using alpha-beta search and iterative
 deepening (ID) called `AB_Improved`. The three `AB_Custom` agents use
 ID and alpha-beta search with the custom_score functions defined in
-game_agent.py.
+game_agent.py. The `MCTS` agent uses Monte Carlo Tree Search and needs no
+evaluation function.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
@@ -131,7 +132,8 @@ def main():
         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
         Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
         Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3"),
+        Agent(MCTSPlayer(), "MCTS")
     ]
 
     # Define a collection of agents to compete against the test agents